@@ -1,13 +1,17 @@
-from typing import overload, Dict, List, Tuple, Generator, Set, Iterable
+from typing import overload, Dict, List, Tuple, Generator, Set, Iterable, Callable, NamedTuple
 import os
 from queue import Queue
 import json
+from enum import Enum
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
-import cv2
+from functools import wraps
+from threading import RLock
 import pygame as pg
-from nltk.tokenize import word_tokenize
+from backend.searchers.synonyms import SynonymsTable, maps_synonyms_path
+from backend.searchers.tags import TagIndex, TagQuery
+from backend.text import tokenize
+from tools.tracing import span, traced
 
 
 class Map:
@@ -26,13 +30,14 @@ class Map:
         self.__path = str(current_dir.joinpath(path).resolve())
         self.__tags = list(map(str.lower, tags))
         self.__thumbnail_path = str(current_dir.joinpath(thumbnail).resolve())
-        thumbnail_size = (320, 320 * (9 / 16))
-        self.__thumbnail = self.__load_thumbnail(self.__thumbnail_path, thumbnail_size)
+        # loaded on first access, the map menu prefers the thumbnails atlas
+        self.__thumbnail = None
         self.__url = url
         self.__favorite = favorite
 
         self.__cap = None
         self.__num_frames = None
+        self.__fps = None
 
     @property
     def name(self) -> str:
@@ -48,6 +53,11 @@ class Map:
 
     @property
     def thumbnail(self) -> pg.Surface:
+        if self.__thumbnail is None:
+            thumbnail_size = (320, 320 * (9 / 16))
+            self.__thumbnail = self.__load_thumbnail(
+                self.__thumbnail_path, thumbnail_size
+            )
         return self.__thumbnail
 
     @property
@@ -62,6 +72,19 @@ class Map:
     def favorite(self) -> bool:
         return self.__favorite
 
+    @favorite.setter
+    def favorite(self, favorite: bool) -> None:
+        self.__favorite = favorite
+
+    @property
+    def fps(self) -> float | None:
+        # native frame rate of the video, known once it is loaded
+        return self.__fps
+
+    @property
+    def num_frames(self) -> int | None:
+        return self.__num_frames
+
     def __load_thumbnail(
         self, thumbnail_path: str, size: Tuple[int, int]
     ) -> pg.Surface:
@@ -87,9 +110,13 @@ class Map:
         return content
 
     def load(self) -> Generator[pg.Surface, None, None]:
+        # OpenCV is slow to import, the first map played pays for it instead of the startup
+        import cv2
+
         if self.__cap is None:
             self.__cap = cv2.VideoCapture(self.path)
             self.__num_frames = int(self.__cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.__fps = self.__cap.get(cv2.CAP_PROP_FPS)
 
         # reset the video to the beginning
         self.__cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
@@ -104,13 +131,14 @@ class Map:
         # Initialize the previous surface as None
         prev_surface = None
         for _ in range(self.__num_frames):
-            _, frame = self.__cap.read()
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame = frame if not resize else cv2.resize(frame, (1920, 1080))
-            frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
-            frame = cv2.flip(frame, 0)
+            with span("decode frame", "map", map=self.__name):
+                _, frame = self.__cap.read()
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame = frame if not resize else cv2.resize(frame, (1920, 1080))
+                frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+                frame = cv2.flip(frame, 0)
 
-            frame = pg.surfarray.make_surface(frame)
+                frame = pg.surfarray.make_surface(frame)
 
             # Release the previous surface to free memory
             if prev_surface is not None:
@@ -129,18 +157,53 @@ class Map:
             self.__cap.release()
             self.__cap = None
             self.__num_frames = None
+            self.__fps = None
 
     def __del__(self) -> None:
         if self.__cap is not None:
             self.__cap.release()
 
 
+class ConfigChange(Enum):
+    MAP_ADDED = 0
+    MAP_REMOVED = 1
+    MAP_RENAMED = 2
+    TAGS_ADDED = 3
+    TAGS_REMOVED = 4
+    FAVORITE_CHANGED = 5
+
+
+class ConfigEvent(NamedTuple):
+    change: ConfigChange
+    map_name: str
+    # the tags that were added or removed, all the tags of an added or removed map
+    tags: Tuple[str, ...] = ()
+    new_name: str | None = None
+    favorite: bool | None = None
+
+
+def locked(method: Callable) -> Callable:
+    """runs a Config method holding its lock, see Config.lock"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Config:
     def __init__(self, config_file: str) -> None:
         self.__config_file = str(Path(config_file).resolve())
         self.__maps = self.__load_maps(self.__config_file)
         self.__maps_names = sorted(self.__maps.keys())
         self.__tags = self.__get_tags(self.__maps)
+        self.__tags_index = self.__create_tags_index(self.__maps)
+        self.__synonyms = self.__load_synonyms(maps_synonyms_path(self.__config_file))
+        self.__subscribers = []
+        # reentrant, the subscribers take it again when a change is published
+        self.__lock = RLock()
 
     @property
     def maps_names(self) -> List[str]:
@@ -150,6 +213,33 @@ class Config:
     def tags(self) -> Set[str]:
         return self.__tags
 
+    @property
+    def synonyms(self) -> SynonymsTable:
+        return self.__synonyms
+
+    @property
+    def tags_index(self) -> TagIndex:
+        return self.__tags_index
+
+    @property
+    def lock(self) -> RLock:
+        """held while the maps change and the change is published, a thread reading the maps
+        while the main thread edits them (the search worker) holds it to never see half a change"""
+        return self.__lock
+
+    @traced("Config.load_synonyms", "config")
+    def __load_synonyms(self, synonyms_file: str) -> SynonymsTable:
+        synonyms = SynonymsTable(synonyms_file)
+        # normally built by tools/synonymsBuilder.py, the missing tags are added once
+        if synonyms.update(self.__tags):
+            synonyms.save()
+        return synonyms
+
+    def __update_synonyms(self, tags: Iterable[str]) -> None:
+        if self.__synonyms.update(tags):
+            self.__synonyms.save()
+
+    @traced("Config.worker_load_maps", "config")
     def __worker_load_maps(self, chunk: List[Dict[str, str]], results: Queue) -> None:
         for item in chunk:
             name = item["name"].title()
@@ -161,6 +251,7 @@ class Config:
             map_obj = Map(name, path, tags, thumbnail, url, favorite)
             results.put(map_obj)
 
+    @traced("Config.load_maps", "config")
     def __load_maps(self, maps_file: str) -> Dict[str, Map]:
         with open(maps_file, "r") as f:
             content = json.load(f)
@@ -187,32 +278,48 @@ class Config:
 
         return tags
 
+    def __create_tags_index(self, maps: Dict[str, Map]) -> TagIndex:
+        tags_index = TagIndex()
+        for name in sorted(maps.keys()):
+            map_obj = maps[name]
+            tags_index.add(name, map_obj.tags, map_obj.favorite)
+        return tags_index
+
     def __save(self) -> None:
         content = [map_obj.to_dict() for map_obj in self.__maps.values()]
         with open(self.__config_file, "w") as f:
             json.dump(content, f, indent=2, sort_keys=True)
 
-    @lru_cache(maxsize=256)
+    def subscribe(self, callback: Callable[[ConfigEvent], None]) -> None:
+        """callback is called after every change of the maps, e.g. to update a search index"""
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[ConfigEvent], None]) -> None:
+        self.__subscribers.remove(callback)
+
+    def __publish(self, event: ConfigEvent) -> None:
+        for callback in list(self.__subscribers):
+            callback(event)
+
     def get_map(self, map_name: str) -> Map:
         name = map_name.title()
         return self.__maps[name]
 
-    @lru_cache(maxsize=256)
-    def get_maps_by_tags(self, tags: List[str]) -> List[Map]:
-        tags = set(map(str.strip, map(str.lower, tags)))
-        matches = []
-        for map_obj in self.__maps.values():
-            if tags.union(map_obj.tags):
-                matches.append(map_obj)
-        return matches
+    def get_maps_by_tags(self, tags: Iterable[str]) -> List[Map]:
+        # maps with any of the tags
+        bits = 0
+        for tag in map(str.strip, map(str.lower, tags)):
+            bits |= self.__tags_index.tag(tag)
+        return [self.__maps[name] for name in self.__tags_index.names(bits)]
 
-    @lru_cache(maxsize=256)
     def get_favorite_maps(self) -> List[Map]:
-        matches = []
-        for map_obj in self.__maps.values():
-            if map_obj.favorite:
-                matches.append(map_obj)
-        return matches
+        names = self.__tags_index.names(self.__tags_index.favorites)
+        return [self.__maps[name] for name in names]
+
+    def filter_maps(self, query: str) -> List[str]:
+        """names of the maps matching a TagQuery, raises QueryError if it is malformed"""
+        bits = TagQuery(query).evaluate(self.__tags_index)
+        return self.__tags_index.names(bits)
 
     @overload
     def add_tags(self, map_name: str, tags: Iterable[str]) -> None:
@@ -222,78 +329,80 @@ class Config:
     def add_tags(self, map_name: str, tags: str) -> None:
         ...
 
+    @locked
     def add_tags(self, map_name: str, tags: Iterable[str] | str) -> None:
         name = map_name.title()
         map_tags = self.__maps[name].tags
 
         if isinstance(tags, str):
-            new_tags = word_tokenize(tags)
+            new_tags = tokenize(tags)
         else:
             new_tags = list(map(str.strip, map(str.lower, tags)))
 
+        added = []
         for tag in new_tags:
             tag_lower = tag.lower().strip()
-            if tag not in map_tags:
+            if tag_lower not in map_tags:
                 map_tags.append(tag_lower)
+                added.append(tag_lower)
             self.__tags.add(tag_lower)
 
+        self.__tags_index.add_tags(name, added)
+        self.__update_synonyms(added)
         self.__save()
+        if added:
+            self.__publish(ConfigEvent(ConfigChange.TAGS_ADDED, name, tuple(added)))
 
     @overload
-    def remove_tag(self, map_name: str, tags: Iterable[str]) -> None:
+    def remove_tags(self, map_name: str, tags: Iterable[str]) -> None:
         ...
 
     @overload
-    def remove_tag(self, map_name: str, tags: str) -> None:
+    def remove_tags(self, map_name: str, tags: str) -> None:
         ...
 
+    @locked
     def remove_tags(self, map_name: str, tags: Iterable[str] | str) -> None:
         name = map_name.title()
         map_tags = self.__maps[name].tags
 
         if isinstance(tags, str):
-            tags_to_remove = word_tokenize(tags)
+            tags_to_remove = tokenize(tags)
         else:
             tags_to_remove = list(map(str.strip, map(str.lower, tags)))
 
+        removed = []
         for tag in tags_to_remove:
-            tag_lower = tag.lower()
-            if tag in map_tags:
+            tag_lower = tag.lower().strip()
+            if tag_lower in map_tags:
+                # the list of the map itself
                 map_tags.remove(tag_lower)
-                self.__maps[name].tags = map_tags
-
-            # count how many times the tag appears in the maps
-            count = 0
-            for map_obj in self.__maps.values():
-                if tag_lower in map_obj.tags:
-                    count += 1
-
-            # if it doesn't appear in any map, or it appears only once, remove it from the tags
-            if count <= 1:
-                self.__tags.discard(tag_lower)
+                removed.append(tag_lower)
+        self.__tags_index.remove_tags(name, removed)
+        self.__discard_unused_tags(removed)
 
         self.__save()
+        if removed:
+            self.__publish(ConfigEvent(ConfigChange.TAGS_REMOVED, name, tuple(removed)))
 
+    def __discard_unused_tags(self, tags: Iterable[str]) -> None:
+        # a tag stays while any map still has it
+        for tag in tags:
+            if self.__tags_index.tag(tag) == 0:
+                self.__tags.discard(tag)
+
+    @locked
     def set_favorite(self, map_name: str, favorite: bool) -> None:
         name = map_name.title()
-        # self.__maps[name].favorite = favorite
-        map_obj = self.__maps[name]
-        new_map_obj = Map(
-            map_obj.name,
-            map_obj.path,
-            map_obj.tags,
-            map_obj.thumbnail_path,
-            map_obj.url,
-            favorite,
-        )
-        self.__maps[name] = new_map_obj
+        self.__maps[name].favorite = favorite
+        self.__tags_index.set_favorite(name, favorite)
         self.__save()
+        self.__publish(ConfigEvent(ConfigChange.FAVORITE_CHANGED, name, favorite=favorite))
 
     def remove_favorite(self, map_name: str) -> None:
-        name = map_name.title()
-        self.__maps[name].favorite = False
-        self.__save()
+        self.set_favorite(map_name, False)
 
+    @locked
     def add_map(self, map_obj: Map) -> None:
         if map_obj.name in self.__maps_names:
             raise ValueError(f"Map {map_obj.name} already exists")
@@ -301,22 +410,36 @@ class Config:
         self.__maps_names.append(map_obj.name)
         self.__maps_names.sort()
         self.__tags |= set(map_obj.tags)
+        self.__tags_index.add(map_obj.name, map_obj.tags, map_obj.favorite)
+        self.__update_synonyms(map_obj.tags)
         self.__save()
+        self.__publish(
+            ConfigEvent(
+                ConfigChange.MAP_ADDED,
+                map_obj.name,
+                tuple(map_obj.tags),
+                favorite=map_obj.favorite,
+            )
+        )
 
+    @locked
     def remove_map(self, map_name: str) -> None:
         name = map_name.title()
         if name not in self.__maps_names:
             raise ValueError(f"Map {name} does not exist")
 
         map_obj = self.__maps.pop(name)
-        for tag in map_obj.tags:
-            self.remove_tag(name, tag)
+        map_obj.release()
         self.__maps_names.remove(name)
+        self.__tags_index.remove(name)
+        self.__discard_unused_tags(map_obj.tags)
         # removing the thumbnail and the map file
-        Path(map_obj.thumbnail).unlink()
-        Path(map_obj.path).unlink()
+        Path(map_obj.thumbnail_path).unlink(missing_ok=True)
+        Path(map_obj.path).unlink(missing_ok=True)
         self.__save()
+        self.__publish(ConfigEvent(ConfigChange.MAP_REMOVED, name, tuple(map_obj.tags)))
 
+    @locked
     def rename_map(self, map_name: str, new_name: str) -> None:
         name = map_name.title()
         new_name = new_name.title()
@@ -339,4 +462,10 @@ class Config:
         self.__maps_names.remove(name)
         self.__maps_names.append(new_name)
         self.__maps_names.sort()
+        self.__tags_index.rename(name, new_name)
         self.__save()
+        self.__publish(
+            ConfigEvent(
+                ConfigChange.MAP_RENAMED, name, tuple(new_map_obj.tags), new_name=new_name
+            )
+        )
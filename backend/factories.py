@@ -1,32 +1,31 @@
+from typing import TYPE_CHECKING
 from abc import ABC, abstractmethod
-from backend.config import Config
-from backend.database.dnd_db import DndDatabase
-from backend.searchers.searchers import Searcher, MapSearcher, TokenSearcher, DBSearcher
-from backend.searchers.strategies import (
-    ScoredMapSearchingStrategy,
-    ScoredTokenSearchingStrategy,
-    DBSearchingStrategy,
-)
-from backend.loader import Loader
 from backend.settings import Settings, Controls
-from backend.tokens import TokensManager
-from tools.downloader import MapsDownloader
+
+if TYPE_CHECKING:
+    # the products pull in NumPy, OpenCV, pymongo and pytube, they are imported by the method
+    # creating them so importing the factory (and main) stays cheap
+    from backend.config import Config
+    from backend.loader import Loader
+    from backend.searchers.searchers import Searcher, TokenSearcher, DBSearcher
+    from backend.tokens import TokensManager
+    from tools.downloader import MapsDownloader
 
 
 class AbstractFactory(ABC):
     @staticmethod
     @abstractmethod
-    def create_config(config_file: str) -> Config:
+    def create_config(config_file: str) -> "Config":
         raise NotImplementedError("Must implement create_config method")
 
     @staticmethod
     @abstractmethod
-    def create_loader(config: Config) -> Loader:
+    def create_loader(config: "Config") -> "Loader":
         raise NotImplementedError("Must implement create_loader method")
 
     @staticmethod
     @abstractmethod
-    def create_searcher(config: Config) -> Searcher:
+    def create_searcher(config: "Config", fast: bool = False) -> "Searcher":
         raise NotImplementedError("Must implement create_searcher method")
 
     @staticmethod
@@ -36,7 +35,7 @@ class AbstractFactory(ABC):
 
     @staticmethod
     @abstractmethod
-    def create_downloader() -> MapsDownloader:
+    def create_downloader() -> "MapsDownloader":
         raise NotImplementedError("Must implement create_downloader method")
 
     @staticmethod
@@ -46,35 +45,46 @@ class AbstractFactory(ABC):
 
     @staticmethod
     @abstractmethod
-    def create_tokens_manager(tokens_dir: str) -> TokensManager:
+    def create_tokens_manager(tokens_dir: str) -> "TokensManager":
         raise NotImplementedError("Must implement create_tokens_manager method")
 
     @staticmethod
     @abstractmethod
-    def create_token_searcher(config: Config) -> TokenSearcher:
+    def create_token_searcher(config: "Config") -> "TokenSearcher":
         raise NotImplementedError("Must implement create_token_searcher method")
 
 
 class SimpleFactory(AbstractFactory):
     @staticmethod
-    def create_config(config_file: str) -> Config:
+    def create_config(config_file: str) -> "Config":
+        from backend.config import Config
+
         return Config(config_file)
 
     @staticmethod
-    def create_loader(config: Config) -> Loader:
+    def create_loader(config: "Config") -> "Loader":
+        from backend.loader import Loader
+
         return Loader(config)
 
     @staticmethod
-    def create_searcher(config: Config) -> Searcher:
-        strategy = ScoredMapSearchingStrategy(config)
-        return MapSearcher(strategy)
+    def create_searcher(config: "Config", fast: bool = False) -> "Searcher":
+        from backend.searchers.searchers import MapSearcher
+        from backend.searchers.strategies import ScoredMapSearchingStrategy
+
+        # fast ranks with the trigram vectors instead of edit distances (settings search.fast)
+        strategy = ScoredMapSearchingStrategy(config, fast=fast)
+        # the searcher keeps its indexes and cached results up to date with the config
+        return MapSearcher(strategy, config)
 
     @staticmethod
     def create_settings(settings_file: str) -> Settings:
         return Settings(settings_file)
 
     @staticmethod
-    def create_downloader() -> MapsDownloader:
+    def create_downloader() -> "MapsDownloader":
+        from tools.downloader import MapsDownloader
+
         return MapsDownloader()
 
     @staticmethod
@@ -82,16 +92,25 @@ class SimpleFactory(AbstractFactory):
         return Controls(settings)
 
     @staticmethod
-    def create_tokens_manager(tokens_dir: str) -> TokensManager:
+    def create_tokens_manager(tokens_dir: str) -> "TokensManager":
+        from backend.tokens import TokensManager
+
         return TokensManager(tokens_dir)
 
     @staticmethod
-    def create_token_searcher(manager: TokensManager) -> TokenSearcher:
+    def create_token_searcher(manager: "TokensManager") -> "TokenSearcher":
+        from backend.searchers.searchers import TokenSearcher
+        from backend.searchers.strategies import ScoredTokenSearchingStrategy
+
         strategy = ScoredTokenSearchingStrategy(manager)
         return TokenSearcher(strategy)
 
     @staticmethod
-    def create_db_searcher() -> DBSearcher:
+    def create_db_searcher() -> "DBSearcher":
+        from backend.database.dnd_db import DndDatabase
+        from backend.searchers.searchers import DBSearcher
+        from backend.searchers.strategies import DBSearchingStrategy
+
         db = DndDatabase()
         strategy = DBSearchingStrategy(db)
         return DBSearcher(strategy)
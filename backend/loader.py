@@ -1,5 +1,6 @@
 from typing import Generator
 from tools.utils import cycle
+from tools.tracing import traced
 import pygame as pg
 from backend.config import Config
 
@@ -10,6 +11,7 @@ class Loader:
         self.__current = None
         self.__buffer = None
 
+    @traced("Loader.load_map", "loader")
     def load_map(self, map_name: str) -> Generator[pg.Surface, None, None]:
         map_obj = self.__config.get_map(map_name)
         if self.__current is not None:
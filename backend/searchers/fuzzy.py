@@ -0,0 +1,164 @@
+from typing import List
+import numpy as np
+from backend.text import normalize, tokenize
+
+
+def levenshtein(a: str, b: str, max_distance: int = None) -> int:
+    """Edit distance with Myers' bit-parallel algorithm (Hyyro's formulation): one column of
+    the dynamic programming table per character of b, as a few integer operations.
+    with max_distance, stops as soon as the distance is known to be larger and returns
+    max_distance + 1"""
+    m = len(a)
+    n = len(b)
+    if max_distance is not None and abs(m - n) > max_distance:
+        return max_distance + 1
+    if m == 0 or n == 0:
+        distance = max(m, n)
+        return distance if max_distance is None else min(distance, max_distance + 1)
+
+    # bit i of peq[c] is set when a[i] == c
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for j, c in enumerate(b):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # every remaining character can lower the distance by one at most
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def similarity(a: str, b: str) -> float:
+    """1.0 for equal strings down to 0.0, normalized by the longer string"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / longest
+
+
+class FuzzyMatcher:
+    """Edit distances from a query to many texts at once. Myers' algorithm runs over all the
+    texts together, a step is one NumPy operation over a column of characters of every text.
+    queries longer than 64 characters fall back to levenshtein"""
+
+    MAX_QUERY_LENGTH = 64
+
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = list(texts)
+        self.lengths = np.array([len(text) for text in self.texts], dtype=np.int64)
+        width = int(self.lengths.max()) if len(self.texts) else 0
+
+        # characters as small codes, 0 pads the short texts
+        self.__alphabet = {}
+        codes = np.zeros((width, len(self.texts)), dtype=np.int32)
+        for i, text in enumerate(self.texts):
+            for j, c in enumerate(text):
+                codes[j, i] = self.__alphabet.setdefault(c, len(self.__alphabet) + 1)
+        self.__codes = codes
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def distances(self, query: str, max_distance: int = None) -> np.ndarray:
+        """edit distance from query to every text, capped at max_distance + 1"""
+        m = len(query)
+        if m == 0 or len(self.texts) == 0:
+            distances = self.lengths.copy()
+            return distances if max_distance is None else np.minimum(distances, max_distance + 1)
+        if m > FuzzyMatcher.MAX_QUERY_LENGTH:
+            return np.array(
+                [levenshtein(query, text, max_distance) for text in self.texts], dtype=np.int64
+            )
+
+        peq = np.zeros(len(self.__alphabet) + 1, dtype=np.uint64)
+        for i, c in enumerate(query):
+            code = self.__alphabet.get(c)
+            if code:
+                peq[code] |= np.uint64(1 << i)
+
+        one = np.uint64(1)
+        full = np.uint64((1 << m) - 1)
+        last = np.uint64(1 << (m - 1))
+        n = len(self.texts)
+        pv = np.full(n, full, dtype=np.uint64)
+        mv = np.zeros(n, dtype=np.uint64)
+        score = np.full(n, m, dtype=np.int64)
+
+        for j in range(self.__codes.shape[0]):
+            active = j < self.lengths
+            if max_distance is not None and not np.any(
+                active & (score - (self.lengths - j) <= max_distance)
+            ):
+                break
+
+            eq = peq[self.__codes[j]]
+            xv = eq | mv
+            # uint64 addition wraps, the carry out of the top bit is not needed
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & full)
+            mh = pv & xh
+            score += active * (((ph & last) != 0).astype(np.int64) - ((mh & last) != 0))
+            ph = ((ph << one) | one) & full
+            mh = (mh << one) & full
+            # texts that ended keep their last column
+            pv = np.where(active, mh | (~(xv | ph) & full), pv)
+            mv = np.where(active, ph & xv, mv)
+
+        if max_distance is not None:
+            score = np.minimum(score, max_distance + 1)
+        return score
+
+    def similarities(self, query: str) -> np.ndarray:
+        """similarity of query to every text, like similarity()"""
+        longest = np.maximum(self.lengths, len(query))
+        longest[longest == 0] = 1
+        return 1.0 - self.distances(query) / longest
+
+
+class NamesMatcher:
+    """Fuzzy similarity of a word to names made of several words: the best similarity to any
+    word of the name, so a typo in one word still matches a long name"""
+
+    def __init__(self, names: List[str]) -> None:
+        self.names = list(names)
+        words = []
+        owners = []
+        for index, name in enumerate(self.names):
+            for word in tokenize(name):
+                words.append(word)
+                owners.append(index)
+        self.__words = FuzzyMatcher(words)
+        self.__owners = np.array(owners, dtype=np.int64)
+
+    def similarities(self, word: str) -> np.ndarray:
+        """similarity of word to every name"""
+        scores = np.zeros(len(self.names), dtype=np.float64)
+        if len(self.__words):
+            np.maximum.at(scores, self.__owners, self.__words.similarities(normalize(word)))
+        return scores
+
+
+def name_similarity(word: str, name: str) -> float:
+    """best similarity of word to a word of name, see NamesMatcher"""
+    return max(
+        (similarity(normalize(word), name_word) for name_word in tokenize(name)),
+        default=0.0,
+    )
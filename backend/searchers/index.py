@@ -0,0 +1,76 @@
+from typing import Dict, Hashable, Iterable, Set
+from collections import defaultdict
+from backend.text import tokenize
+
+
+class TrigramIndex:
+    """Inverted index from character trigrams to keys, for finding the keys whose text is
+    similar to a query without comparing the query to every text."""
+
+    def __init__(self) -> None:
+        self.__postings = defaultdict(set)
+        self.__trigrams = {}
+
+    def __len__(self) -> int:
+        return len(self.__trigrams)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__trigrams
+
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        # every word is padded, so short words and word starts get trigrams of their own
+        grams = set()
+        for word in tokenize(text):
+            padded = f"  {word} "
+            for i in range(len(padded) - 2):
+                grams.add(padded[i : i + 3])
+        return grams
+
+    @staticmethod
+    def dice(a: str, b: str) -> float:
+        """trigram Dice coefficient of two texts, what candidates compares to the threshold"""
+        grams_a = TrigramIndex.trigrams(a)
+        grams_b = TrigramIndex.trigrams(b)
+        if len(grams_a) + len(grams_b) == 0:
+            return 0.0
+        return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+    def add(self, key: Hashable, text: str) -> None:
+        if key in self.__trigrams:
+            self.remove(key)
+        grams = self.trigrams(text)
+        self.__trigrams[key] = grams
+        for gram in grams:
+            self.__postings[gram].add(key)
+
+    def update(self, items: Iterable[tuple]) -> None:
+        for key, text in items:
+            self.add(key, text)
+
+    def remove(self, key: Hashable) -> None:
+        grams = self.__trigrams.pop(key, set())
+        for gram in grams:
+            keys = self.__postings[gram]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.__postings[gram]
+
+    def candidates(self, text: str, threshold: float = 0.25) -> Dict[Hashable, float]:
+        """keys whose trigram Dice coefficient with text is at least threshold"""
+        query = self.trigrams(text)
+        if len(query) == 0:
+            return {}
+
+        # only the keys sharing a trigram with the query are visited
+        shared = defaultdict(int)
+        for gram in query:
+            for key in self.__postings.get(gram, ()):
+                shared[key] += 1
+
+        matches = {}
+        for key, count in shared.items():
+            dice = 2 * count / (len(query) + len(self.__trigrams[key]))
+            if dice >= threshold:
+                matches[key] = dice
+        return matches
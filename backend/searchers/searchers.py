@@ -1,6 +1,8 @@
-from typing import List
+from typing import Callable, Hashable, List
 from abc import ABC, abstractmethod
-from functools import lru_cache
+from collections import OrderedDict
+from threading import Lock
+from backend.config import Config, ConfigEvent
 from backend.searchers.strategies import SearchingStrategy
 
 
@@ -10,31 +12,123 @@ class Searcher(ABC):
         raise NotImplementedError("Must implement search method")
 
 
+class QueryCache:
+    """LRU cache of search results by (query, n), a change of the searched data drops only
+    the results it made stale"""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.__maxsize = maxsize
+        self.__entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def get(self, key: Hashable) -> List | None:
+        if key not in self.__entries:
+            return None
+        self.__entries.move_to_end(key)
+        return self.__entries[key]
+
+    def put(self, key: Hashable, matches: List) -> None:
+        self.__entries[key] = matches
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.__maxsize:
+            self.__entries.popitem(last=False)
+
+    def invalidate(self, is_stale: Callable[[str, List], bool]) -> int:
+        """drop the results is_stale(query, matches) is true for, returns how many"""
+        stale = [key for key, matches in self.__entries.items() if is_stale(key[0], matches)]
+        for key in stale:
+            del self.__entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+
+
 class MapSearcher(Searcher):
-    def __init__(self, strategy: SearchingStrategy) -> None:
+    """Searches the maps with a strategy and caches the results, kept up to date with the
+    changes of the config.
+
+    The search worker searches while the main thread edits the config, and an edit must not
+    wait for a search. A published change is only queued, the next search applies the queued
+    changes to the strategy (the strategy keeps its own copies of the maps) while holding the
+    config lock, then searches without it. A change published meanwhile makes the search run
+    again, so a result never mixes the maps before and after an edit.
+    """
+
+    def __init__(self, strategy: SearchingStrategy, config: Config = None) -> None:
         self.__strategy = strategy
+        self.__cache = QueryCache()
+        # one search at a time, the strategy and the cache are only used under it
+        self.__lock = Lock()
+        self.__config_lock = config.lock if config is not None else Lock()
+        # the changes published since the last search, guarded by the config lock
+        self.__changes = []
+        if config is not None:
+            config.subscribe(self.__on_config_change)
 
-    @lru_cache(maxsize=1024)
     def search(self, query: str, n: int = -1) -> List[str]:
-        matches = self.__strategy.search(query, n)
-        return matches
+        key = (query, n)
+        with self.__lock:
+            while True:
+                with self.__config_lock:
+                    changes = self.__changes
+                    self.__changes = []
+                    for event in changes:
+                        self.__cache.invalidate(self.__strategy.apply_change(event))
+
+                matches = self.__cache.get(key)
+                if matches is not None:
+                    return matches
+                try:
+                    matches = self.__strategy.search(query, n)
+                    error = None
+                except Exception as e:
+                    # the config may have changed under the search, it is checked below
+                    error = e
+
+                # waits for an edit in progress, its change is then queued
+                with self.__config_lock:
+                    changed = len(self.__changes) > 0
+                if changed:
+                    continue
+                if error is not None:
+                    raise error
+                self.__cache.put(key, matches)
+                return matches
+
+    def __on_config_change(self, event: ConfigEvent) -> None:
+        # called by the config holding its lock, on the thread editing it
+        self.__changes.append(event)
 
 
 class TokenSearcher(Searcher):
     def __init__(self, strategy: SearchingStrategy) -> None:
         self.__strategy = strategy
+        self.__cache = QueryCache()
 
-    @lru_cache(maxsize=1024)
     def search(self, query: str, n: int = -1) -> List[str]:
-        matches = self.__strategy.search(query, n)
+        key = (query, n)
+        matches = self.__cache.get(key)
+        if matches is None:
+            matches = self.__strategy.search(query, n)
+            self.__cache.put(key, matches)
         return matches
 
 
 class DBSearcher(Searcher):
     def __init__(self, strategy: SearchingStrategy) -> None:
         self.__strategy = strategy
+        self.__cache = QueryCache()
 
-    @lru_cache(maxsize=1024)
     def search(self, query: str, n: int = -1) -> List[str]:
-        matches = self.__strategy.search(query, n)
+        key = (query, n)
+        matches = self.__cache.get(key)
+        if matches is None:
+            matches = self.__strategy.search(query, n)
+            self.__cache.put(key, matches)
         return matches
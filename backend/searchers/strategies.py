@@ -1,13 +1,22 @@
-from typing import List, Set, Dict, Any
+from typing import TYPE_CHECKING, List, Set, Dict, Any, Callable
 from abc import ABC, abstractmethod
+from bisect import insort
 from collections import defaultdict
 import operator
 import difflib
-from nltk.tokenize import word_tokenize
-from nltk.corpus import wordnet
-from backend.config import Config
+import numpy as np
+from backend.config import Config, ConfigChange, ConfigEvent
 from backend.tokens import TokensManager
-from backend.database.dnd_db import DndDatabase
+from backend.text import tokenize
+from backend.searchers.index import TrigramIndex
+from backend.searchers.vectors import TrigramVectors, top_k
+from backend.searchers.fuzzy import FuzzyMatcher, NamesMatcher, name_similarity, similarity
+from backend.searchers.tags import TagQuery, QueryError
+from tools.tracing import traced
+
+if TYPE_CHECKING:
+    # pymongo is only imported when the database searcher is created
+    from backend.database.dnd_db import DndDatabase
 
 
 class SearchingStrategy(ABC):
@@ -15,6 +24,11 @@ class SearchingStrategy(ABC):
     def search(self, query: str, n: int = -1) -> List[str]:
         raise NotImplementedError("Must implement search method")
 
+    def apply_change(self, event: ConfigEvent) -> Callable[[str, List[str]], bool]:
+        """update the strategy after a change of the config, returns whether the cached
+        matches of a query are stale now"""
+        return lambda query, matches: True
+
 
 class BasicMapSearchingStrategy(SearchingStrategy):
     def __init__(self, config: Config, accuracy: float = 0.5) -> None:
@@ -22,8 +36,23 @@ class BasicMapSearchingStrategy(SearchingStrategy):
         self.__accuracy = accuracy
         self.__maps_names = self.__config.maps_names
         self.__tags = self.__config.tags
+        self.__create_indexes()
+
+    def __create_indexes(self) -> None:
         self.__tags_mapping = self.__create_tags_mapping()
         self.__n = len(self.__maps_names)
+        # edit distance similarity, one batched pass over all the tags or names per query word
+        self.__tags_matcher = FuzzyMatcher(list(self.__tags))
+        self.__names_matcher = NamesMatcher(self.__maps_names)
+        self.__maps_indices = {name: i for i, name in enumerate(self.__maps_names)}
+
+    def apply_change(self, event: ConfigEvent) -> Callable[[str, List[str]], bool]:
+        if event.change == ConfigChange.FAVORITE_CHANGED:
+            # only filters look at the favorites
+            return lambda query, matches: TagQuery.is_filter(query)
+        # the batched matchers are rebuilt and every result may change
+        self.__create_indexes()
+        return lambda query, matches: True
 
     def __create_tags_mapping(self) -> Dict[str, Set[str]]:
         tags_mapping = defaultdict(set)
@@ -35,18 +64,19 @@ class BasicMapSearchingStrategy(SearchingStrategy):
         return tags_mapping
 
     def __get_query_tags(self, query: str) -> List[str]:
-        query_tags = list(set(list(map(str.strip, query.split()))))
+        query_tags = list(set(tokenize(query)))
         tags_matches = set()
         # self.__accuracy is a float between 0 and 1. tries is the number of times we will try to find a match
         tries = int(1.0 / self.__accuracy) + 1
         for tag in query_tags:
+            similarities = self.__tags_matcher.similarities(tag)
             for i in range(tries):
                 cutoff = 1.0 - (self.__accuracy * i)
-                matches = difflib.get_close_matches(
-                    tag, self.__tags, n=5, cutoff=cutoff
-                )
-                if len(matches) != 0:
-                    tags_matches |= set(matches)
+                # the 5 closest tags above the cutoff
+                close = np.flatnonzero(similarities >= cutoff)
+                if len(close) != 0:
+                    close = close[np.argsort(-similarities[close], kind="stable")[:5]]
+                    tags_matches |= {self.__tags_matcher.texts[j] for j in close}
                     break
 
         return list(tags_matches)
@@ -64,12 +94,11 @@ class BasicMapSearchingStrategy(SearchingStrategy):
     def __get_best_matches(self, query_tags: List[str], maps: List[str]) -> List[str]:
         matches = []
         num_tags = len(query_tags)
+        # the similarity between each tag and the closest word of every map name
+        tags_ratios = [self.__names_matcher.similarities(tag) for tag in query_tags]
         for map_name in maps:
-            map_ratio = 0
-            for tag in query_tags:
-                # check the matching ratio between the tag and the map name
-                ratio = difflib.SequenceMatcher(None, tag, map_name).ratio()
-                map_ratio += ratio
+            index = self.__maps_indices[map_name]
+            map_ratio = sum(ratios[index] for ratios in tags_ratios)
             map_ratio = map_ratio / num_tags
             matches.append((map_name, map_ratio))
 
@@ -77,12 +106,27 @@ class BasicMapSearchingStrategy(SearchingStrategy):
         matches = [map_name for map_name, _ in matches]
         return matches
 
+    def __filter_maps(self, query: str) -> List[str] | None:
+        # tags filters (e.g. "forest -night favorite:true") are answered by the tags index
+        if not TagQuery.is_filter(query):
+            return None
+        try:
+            return self.__config.filter_maps(query)
+        except QueryError:
+            # a filter being typed, e.g. an open parenthesis, is searched as text meanwhile
+            return None
+
+    @traced("BasicMapSearchingStrategy.search", "search")
     def search(self, query: str, n: int = -1) -> List[str]:
         if n < 0:
             n = self.__n
 
         if query.strip() == "":
-            return self.__maps_names
+            return list(self.__maps_names)
+
+        filtered = self.__filter_maps(query)
+        if filtered is not None:
+            return filtered[:n]
 
         query_tags = self.__get_query_tags(query)
         maps_scores = self.__get_maps_scores(query_tags)
@@ -92,77 +136,191 @@ class BasicMapSearchingStrategy(SearchingStrategy):
 
 
 class ScoredMapSearchingStrategy(SearchingStrategy):
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self, config: Config, candidates_threshold: float = 0.25, fast: bool = False
+    ) -> None:
         self.__config = config
-        self.__maps_names = self.__config.maps_names
+        # own copies, patched by apply_change between searches (see MapSearcher)
+        self.__maps_tags = {
+            name: set(self.__config.get_map(name).tags) for name in self.__config.maps_names
+        }
+        self.__maps_names = sorted(self.__maps_tags)
         self.__tags_mapping = self.__create_tags_mapping()
-        self.__n = len(self.__maps_names)
+        # fast: rank every map with one vectorized trigram similarity instead of edit distances
+        self.__fast = fast
+        self.__vectors = None
+        self.__names_array = None
+        if self.__fast:
+            self.__create_vectors()
+        # only maps whose name or tags share enough trigrams with the query are scored
+        self.__candidates_threshold = candidates_threshold
+        self.__names_index = TrigramIndex()
+        self.__names_index.update((name, name) for name in self.__maps_names)
+        self.__tags_index = TrigramIndex()
+        self.__tags_index.update((tag, tag) for tag in self.__tags_mapping)
+        # search as you type: the candidates and ratios of the previous query are reused for
+        # the words that did not change, one search at a time (see SearchWorker)
+        self.__previous_candidates = {}
+        self.__previous_ratios = {}
 
     def __create_tags_mapping(self) -> Dict[str, Set[str]]:
         tags_mapping = defaultdict(set)
-        for map_name in self.__maps_names:
-            map_obj = self.__config.get_map(map_name)
-            for tag in map_obj.tags:
+        for map_name, tags in self.__maps_tags.items():
+            for tag in tags:
                 tags_mapping[tag].add(map_name)
 
         return tags_mapping
 
-    def __get_query_tokens(self, query: str) -> List[str]:
-        return word_tokenize(query)
-
-    def __get_query_tags_scores(self, query: str) -> Dict[str, int]:
-        scores = defaultdict(lambda: 0)
-        query_tokens = self.__get_query_tokens(query)
-        # sum the ratios of each token to each tag
-        for token in query_tokens:
-            for tag, maps in self.__tags_mapping.items():
-                ratio = difflib.SequenceMatcher(None, token, tag).ratio()
-                for map_name in maps:
-                    scores[map_name] += ratio
-        return scores
-
-    def __get_maps_names_scores(self, query: str) -> Dict[str, int]:
-        scores = defaultdict(lambda: 0)
-        query_as_title = query.title()
-        # sum the ratios of each token to each map name
-        for map_name in self.__maps_names:
-            score = 0
-            for token in query_as_title.split():
-                ratio = difflib.SequenceMatcher(None, token, map_name).ratio()
-                score += ratio
-            scores[map_name] = score
-        return scores
-
-    def __get_query_tags_synonyms(self, query: str) -> Dict[str, Set[str]]:
-        query_tokens = self.__get_query_tokens(query)
-        tokens_synonyms = defaultdict(set)
-        for token in query_tokens:
-            for syn in wordnet.synsets(token):
-                for l in syn.lemmas():
-                    tokens_synonyms[token].add(l.name())
-        return tokens_synonyms
-
-    def __get_query_synonyms_scores(self, query: str) -> Dict[str, int]:
-        scores = defaultdict(lambda: 0)
-        query_tokens = self.__get_query_tokens(query)
-        tokens_synonyms = self.__get_query_tags_synonyms(query)
-        for token in query_tokens:
-            for synonym in tokens_synonyms[token]:
-                for tag, maps in self.__tags_mapping.items():
-                    ratio = difflib.SequenceMatcher(None, synonym, tag).ratio()
-                    for map_name in maps:
-                        scores[map_name] += ratio
-        return scores
+    def __create_vectors(self) -> None:
+        # field 0 the names, field 1 the tags
+        self.__vectors = TrigramVectors(
+            self.__maps_names,
+            [" ".join(sorted(self.__maps_tags[name])) for name in self.__maps_names],
+        )
+        # a query of every map turns thousands of indices into names, NumPy does it at once
+        self.__names_array = np.array(self.__maps_names, dtype=object)
+
+    def __add_map(self, map_name: str, tags: Set[str]) -> None:
+        self.__maps_tags[map_name] = set()
+        insort(self.__maps_names, map_name)
+        self.__names_index.add(map_name, map_name)
+        self.__add_tags(map_name, tags)
+
+    def __remove_map(self, map_name: str) -> None:
+        self.__remove_tags(map_name, list(self.__maps_tags[map_name]))
+        del self.__maps_tags[map_name]
+        self.__maps_names.remove(map_name)
+        self.__names_index.remove(map_name)
+
+    def __add_tags(self, map_name: str, tags: Set[str]) -> None:
+        self.__maps_tags[map_name] |= set(tags)
+        for tag in tags:
+            if tag not in self.__tags_mapping:
+                self.__tags_index.add(tag, tag)
+            self.__tags_mapping[tag].add(map_name)
+
+    def __remove_tags(self, map_name: str, tags: Set[str]) -> None:
+        self.__maps_tags[map_name] -= set(tags)
+        for tag in tags:
+            maps = self.__tags_mapping.get(tag)
+            if maps is None:
+                continue
+            maps.discard(map_name)
+            if len(maps) == 0:
+                del self.__tags_mapping[tag]
+                self.__tags_index.remove(tag)
+
+    def apply_change(self, event: ConfigEvent) -> Callable[[str, List[str]], bool]:
+        change = event.change
+        if change == ConfigChange.FAVORITE_CHANGED:
+            # only filters look at the favorites
+            return lambda query, matches: TagQuery.is_filter(query)
+
+        map_name = event.map_name
+        if change == ConfigChange.MAP_ADDED:
+            self.__add_map(map_name, event.tags)
+        elif change == ConfigChange.MAP_REMOVED:
+            self.__remove_map(map_name)
+        elif change == ConfigChange.MAP_RENAMED:
+            tags = set(self.__maps_tags[map_name])
+            self.__remove_map(map_name)
+            map_name = event.new_name
+            self.__add_map(map_name, tags)
+        elif change == ConfigChange.TAGS_ADDED:
+            self.__add_tags(map_name, event.tags)
+        elif change == ConfigChange.TAGS_REMOVED:
+            self.__remove_tags(map_name, event.tags)
+        # the candidates of a word may have changed, the ratios of two texts never do
+        self.__previous_candidates = {}
+
+        if self.__fast:
+            # the idf weights of every map change, the next search rebuilds the vectors
+            self.__vectors = None
+            return lambda query, matches: True
+
+        names_changed = change != ConfigChange.TAGS_ADDED and change != ConfigChange.TAGS_REMOVED
+        # a map that is (still) there can enter the results of a query that matches its texts
+        texts = []
+        if map_name in self.__maps_tags:
+            texts = [map_name, *self.__maps_tags[map_name]]
+
+        def is_stale(query: str, matches: List[str]) -> bool:
+            if query.strip() == "":
+                return names_changed
+            if TagQuery.is_filter(query):
+                return True
+            if event.map_name in matches or map_name in matches:
+                return True
+            return self.__may_match(query, texts)
+
+        return is_stale
+
+    def __may_match(self, query: str, texts: List[str]) -> bool:
+        # the test __get_word_candidates does, for the texts of one map
+        for word in set(tokenize(query)):
+            synonyms = self.__config.synonyms.lookup(word)
+            for text in texts:
+                if text in synonyms:
+                    return True
+                if TrigramIndex.dice(word, text) >= self.__candidates_threshold:
+                    return True
+        return False
+
+    def __get_query_tags_synonyms(self, query_tokens: List[str]) -> Dict[str, Set[str]]:
+        # the tags each token is a synonym of, from the precomputed table
+        return self.__config.synonyms.synonyms(query_tokens)
+
+    def __get_word_candidates(self, word: str) -> Set[str]:
+        candidates = set(self.__names_index.candidates(word, self.__candidates_threshold))
+        for tag in self.__tags_index.candidates(word, self.__candidates_threshold):
+            candidates |= self.__tags_mapping[tag]
+        # synonyms are tags already
+        for tag in self.__config.synonyms.lookup(word):
+            candidates |= self.__tags_mapping.get(tag, set())
+        return candidates
+
+    def __get_candidates(self, words: Set[str]) -> Set[str]:
+        # typing changes the last word only, the others were looked up by the previous query
+        previous = self.__previous_candidates
+        words_candidates = {
+            word: previous[word] if word in previous else self.__get_word_candidates(word)
+            for word in words
+        }
+        self.__previous_candidates = words_candidates
+        return set().union(*words_candidates.values())
+
+    def __get_best_matches(self, query_tokens: List[str]) -> List[str]:
+        tokens_synonyms = self.__get_query_tags_synonyms(query_tokens)
+        candidates = self.__get_candidates(set(query_tokens))
+
+        # many maps share tags, every pair is compared once per query, and the pairs of the
+        # previous query are still valid
+        previous = self.__previous_ratios
+        ratios = {}
+
+        def ratio(a: str, b: str, scorer: Callable[[str, str], float] = similarity) -> float:
+            key = (scorer, a, b)
+            if key not in ratios:
+                ratios[key] = previous[key] if key in previous else scorer(a, b)
+            return ratios[key]
+
+        def name_ratio(word: str, map_name: str) -> float:
+            # a typo in one word of a long name still matches it
+            return ratio(word, map_name, name_similarity)
 
-    def __get_best_matches(self, query: str, maps: List[str]) -> List[str]:
         matches = []
-        query_tags_scores = self.__get_query_tags_scores(query)
-        maps_names_scores = self.__get_maps_names_scores(query)
-        synonyms_scores = self.__get_query_synonyms_scores(query)
-        for map_name in maps:
-            map_name_score = maps_names_scores[map_name]
-            query_tags_score = query_tags_scores[map_name]
-            synonyms_score = synonyms_scores[map_name]
+        for map_name in candidates:
+            tags = self.__maps_tags[map_name]
+            # the scores of a candidate are the same as when scoring every map
+            map_name_score = sum(
+                name_ratio(token, map_name) for token in query_tokens
+            )
+            query_tags_score = sum(
+                ratio(token, tag) for token in query_tokens for tag in tags
+            )
+            synonyms_score = sum(
+                len(tokens_synonyms[token] & tags) for token in query_tokens
+            )
             map_score = (
                 (0.6 * map_name_score)
                 + (0.4 * query_tags_score)
@@ -170,67 +328,87 @@ class ScoredMapSearchingStrategy(SearchingStrategy):
             )
             matches.append((map_name, map_score))
 
-        matches.sort(key=operator.itemgetter(1), reverse=True)
+        self.__previous_ratios = ratios
+        # ties keep the maps order, like sorting all the maps did
+        matches.sort(key=lambda match: (-match[1], match[0]))
         matches = [map_name for map_name, _ in matches]
         return matches
 
+    def __filter_maps(self, query: str) -> List[str] | None:
+        # tags filters (e.g. "forest -night favorite:true") are answered by the tags index
+        if not TagQuery.is_filter(query):
+            return None
+        try:
+            return self.__config.filter_maps(query)
+        except QueryError:
+            # a filter being typed, e.g. an open parenthesis, is searched as text meanwhile
+            return None
+
+    @traced("ScoredMapSearchingStrategy.search", "search")
     def search(self, query: str, n: int = -1) -> List[str]:
         if n < 0:
-            n = self.__n
+            n = len(self.__maps_names)
 
         if query.strip() == "":
-            return self.__maps_names
-
-        query = query.strip().lower()
-        matches = self.__get_best_matches(query, self.__maps_names)
+            return list(self.__maps_names)
+
+        filtered = self.__filter_maps(query)
+        if filtered is not None:
+            return filtered[:n]
+
+        # tokenized once, every score below works on the same words
+        query_tokens = tokenize(query)
+        if self.__fast:
+            if self.__vectors is None:
+                self.__create_vectors()
+            return self.__get_best_matches_fast(query_tokens, n)
+        matches = self.__get_best_matches(query_tokens)
         return matches[:n]
 
+    def __get_best_matches_fast(self, query_tokens: List[str], n: int) -> List[str]:
+        tokens_synonyms = self.__get_query_tags_synonyms(query_tokens)
+        synonyms = set().union(*tokens_synonyms.values()) if tokens_synonyms else set()
+        query = " ".join(query_tokens)
+        # one pass over the vectors for the names, the tags and the synonyms
+        scores = self.__vectors.weighted_scores(
+            [(query, 0, 0.6), (query, 1, 0.4), (" ".join(synonyms), 1, 0.1)]
+        )
+        return self.__names_array[top_k(scores, n)].tolist()
+
 
 class ScoredTokenSearchingStrategy(SearchingStrategy):
-    def __init__(self, tokens_manager: TokensManager) -> None:
+    def __init__(self, tokens_manager: TokensManager, fast: bool = False) -> None:
         self.__tokens_manager = tokens_manager
         self.__tokens_names = self.__tokens_manager.tokens_names
         self.__n = len(self.__tokens_names)
-
-    def __get_query_tokens(self, query: str) -> List[str]:
-        return word_tokenize(query)
-
-    def __get_query_tokens_synonyms(self, query: str) -> Dict[str, Set[str]]:
-        query_tokens = self.__get_query_tokens(query)
-        tokens_synonyms = defaultdict(set)
-        for token in query_tokens:
-            for syn in wordnet.synsets(token):
-                for l in syn.lemmas():
-                    tokens_synonyms[token].add(l.name())
-        return tokens_synonyms
-
-    def __get_query_synonyms_scores(self, query: str) -> Dict[str, int]:
-        scores = defaultdict(lambda: 0)
-        query_tokens = self.__get_query_tokens(query)
-        tokens_synonyms = self.__get_query_tokens_synonyms(query)
+        # fast: rank every token with one vectorized trigram similarity instead of edit distances
+        self.__fast = fast
+        self.__names_vectors = TrigramVectors(self.__tokens_names) if fast else None
+        self.__names_matcher = None if fast else NamesMatcher(self.__tokens_names)
+
+    def __get_query_tokens_synonyms(self, query_tokens: List[str]) -> Dict[str, Set[str]]:
+        # the words of the tokens names each query token is a synonym of
+        return self.__tokens_manager.synonyms.synonyms(query_tokens)
+
+    def __get_query_synonyms_scores(self, query_tokens: List[str]) -> Dict[str, int]:
+        scores = np.zeros(self.__n)
+        tokens_synonyms = self.__get_query_tokens_synonyms(query_tokens)
         for token in query_tokens:
             for synonym in tokens_synonyms[token]:
-                for token_name in self.__tokens_names:
-                    ratio = difflib.SequenceMatcher(None, synonym, token_name).ratio()
-                    scores[token_name] += ratio
-        return scores
+                scores += self.__names_matcher.similarities(synonym)
+        return dict(zip(self.__tokens_names, scores))
 
-    def __get_tokens_names_scores(self, query: str) -> Dict[str, int]:
-        scores = defaultdict(lambda: 0)
-        query_tokens = self.__get_query_tokens(query)
-        # sum the ratios of each token to each token name
-        for token_name in self.__tokens_names:
-            score = 0
-            for token in query_tokens:
-                ratio = difflib.SequenceMatcher(None, token, token_name).ratio()
-                score += ratio
-            scores[token_name] = score
-        return scores
+    def __get_tokens_names_scores(self, query_tokens: List[str]) -> Dict[str, int]:
+        scores = np.zeros(self.__n)
+        # sum the ratios of each token to the closest word of each token name
+        for token in query_tokens:
+            scores += self.__names_matcher.similarities(token)
+        return dict(zip(self.__tokens_names, scores))
 
-    def __get_best_matches(self, query: str, tokens: List[str]) -> List[str]:
+    def __get_best_matches(self, query_tokens: List[str], tokens: List[str]) -> List[str]:
         matches = []
-        tokens_names_scores = self.__get_tokens_names_scores(query)
-        synonyms_scores = self.__get_query_synonyms_scores(query)
+        tokens_names_scores = self.__get_tokens_names_scores(query_tokens)
+        synonyms_scores = self.__get_query_synonyms_scores(query_tokens)
         for token_name in tokens:
             token_name_score = tokens_names_scores[token_name]
             synonyms_score = synonyms_scores[token_name]
@@ -241,6 +419,7 @@ class ScoredTokenSearchingStrategy(SearchingStrategy):
         matches = [token_name for token_name, _ in matches]
         return matches
 
+    @traced("ScoredTokenSearchingStrategy.search", "search")
     def search(self, query: str, n: int = -1) -> List[str]:
         if n < 0:
             n = self.__n
@@ -248,13 +427,23 @@ class ScoredTokenSearchingStrategy(SearchingStrategy):
         if query.strip() == "":
             return self.__tokens_names
 
-        query = query.strip().lower()
-        matches = self.__get_best_matches(query, self.__tokens_names)
+        query_tokens = tokenize(query)
+        if self.__fast:
+            return self.__get_best_matches_fast(query_tokens, n)
+        matches = self.__get_best_matches(query_tokens, self.__tokens_names)
         return matches[:n]
 
+    def __get_best_matches_fast(self, query_tokens: List[str], n: int) -> List[str]:
+        tokens_synonyms = self.__get_query_tokens_synonyms(query_tokens)
+        synonyms = set().union(*tokens_synonyms.values()) if tokens_synonyms else set()
+        scores = self.__names_vectors.weighted_scores(
+            [(" ".join(query_tokens), 0, 0.9), (" ".join(synonyms), 0, 0.1)]
+        )
+        return [self.__tokens_names[i] for i in top_k(scores, n)]
+
 
 class DBSearchingStrategy(SearchingStrategy):
-    def __init__(self, db: DndDatabase) -> None:
+    def __init__(self, db: "DndDatabase") -> None:
         self.__db = db
 
     def __get_relevant_elements(self, query: str) -> List[Dict[str, Any]]:
@@ -273,6 +462,7 @@ class DBSearchingStrategy(SearchingStrategy):
             results.extend(result)
         return results
 
+    @traced("DBSearchingStrategy.search", "search")
     def search(self, query: str, n: int = -1) -> List[Dict[str, Any]]:
         if n < 0:
             n = 10
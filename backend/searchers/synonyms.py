@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, Set
+import json
+from pathlib import Path
+from collections import defaultdict
+from backend.text import stem, tokenize
+
+
+def maps_synonyms_path(maps_config: str) -> str:
+    """the synonyms table of the maps tags, next to the maps config"""
+    path = Path(maps_config)
+    return str(path.with_name(f"{path.stem}_synonyms.json"))
+
+
+def tokens_synonyms_path(tokens_dir: str) -> str:
+    """the synonyms table of the tokens names, inside the tokens directory"""
+    return str(Path(tokens_dir).joinpath("synonyms.json"))
+
+
+class SynonymsTable:
+    """Reverse synonyms table: a WordNet lemma to the words of a vocabulary (the maps tags, the
+    words of the tokens names) it is a synonym of. It is built offline by
+    tools/synonymsBuilder.py, so a query resolves synonyms with a dict lookup and NLTK is only
+    loaded when the vocabulary grows."""
+
+    def __init__(self, path: str = None) -> None:
+        self.__path = path
+        self.__table = defaultdict(set)
+        self.__vocabulary = set()
+        # not looked up again once found missing
+        self.__wordnet_missing = False
+        if path is not None and Path(path).exists():
+            self.__load(path)
+
+    def __len__(self) -> int:
+        return len(self.__table)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def vocabulary(self) -> Set[str]:
+        return self.__vocabulary
+
+    @staticmethod
+    def key(word: str) -> str:
+        # WordNet joins the words of a lemma with underscores
+        return "_".join(tokenize(word))
+
+    def __load(self, path: str) -> None:
+        with open(path, "r") as f:
+            content = json.load(f)
+        self.__vocabulary = set(content["vocabulary"])
+        for lemma, words in content["synonyms"].items():
+            self.__table[lemma] = set(words)
+
+    def save(self, path: str = None) -> None:
+        path = path or self.__path
+        content = {
+            "vocabulary": sorted(self.__vocabulary),
+            "synonyms": {lemma: sorted(words) for lemma, words in self.__table.items()},
+        }
+        with open(path, "w") as f:
+            json.dump(content, f, sort_keys=True)
+        self.__path = path
+
+    def lookup(self, word: str) -> Set[str]:
+        """the words of the vocabulary word is a synonym of, itself included"""
+        key = self.key(word)
+        if key in self.__table:
+            return self.__table[key]
+        # WordNet lemmas are singular, "ruins" finds the synonyms of "ruin"
+        return self.__table.get(stem(key), set())
+
+    def update(self, words: Iterable[str]) -> bool:
+        """add the synonyms of the new words of the vocabulary, returns whether any was new.
+        without WordNet the new words are only synonyms of themselves, and are left out of the
+        vocabulary so they get their synonyms once WordNet is installed"""
+        missing = {self.key(word) for word in words} - self.__vocabulary
+        missing.discard("")
+        if len(missing) == 0:
+            return False
+
+        for word in missing:
+            self.__table[word].add(word)
+
+        lemmas = self.__wordnet_lemmas(missing)
+        if lemmas is None:
+            return False
+        for word, word_lemmas in lemmas.items():
+            for lemma in word_lemmas:
+                self.__table[lemma].add(word)
+        self.__vocabulary |= missing
+        return True
+
+    def __wordnet_lemmas(self, words: Iterable[str]) -> Dict[str, Set[str]] | None:
+        """the WordNet lemmas of every word, None if NLTK or its WordNet corpus is missing"""
+        if self.__wordnet_missing:
+            return None
+
+        # only the build step and vocabulary changes pay for loading WordNet
+        try:
+            from nltk.corpus import wordnet
+
+            return {
+                word: {
+                    lemma.name().lower() for syn in wordnet.synsets(word) for lemma in syn.lemmas()
+                }
+                for word in words
+            }
+        except (ImportError, LookupError):
+            # NLTK is optional, and the corpus is downloaded apart (nltk.download("wordnet"))
+            self.__wordnet_missing = True
+            return None
+
+    def synonyms(self, words: Iterable[str]) -> Dict[str, Set[str]]:
+        """lookup of every word"""
+        return {word: self.lookup(word) for word in words}
@@ -0,0 +1,239 @@
+from typing import Iterable, List, Tuple
+from bisect import bisect_left
+import re
+
+
+class TagIndex:
+    """Bitsets of the maps of every tag, over map ids: Python ints where bit i is the map with
+    id i. A tags filter is then a few bitwise operations whatever the number of maps, only
+    turning the result back into names visits the matching maps."""
+
+    def __init__(self) -> None:
+        self.__ids = {}
+        # id -> name and tags, None for the ids of removed maps until they are reused
+        self.__names = []
+        self.__maps_tags = []
+        self.__free_ids = []
+        self.__tags = {}
+        self.__favorites = 0
+        self.__all = 0
+        # (lower name, id) sorted, for name prefixes, rebuilt after the names change
+        self.__sorted_names = None
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__ids
+
+    @property
+    def all(self) -> int:
+        return self.__all
+
+    @property
+    def favorites(self) -> int:
+        return self.__favorites
+
+    def add(self, name: str, tags: Iterable[str], favorite: bool = False) -> None:
+        if name in self.__ids:
+            self.remove(name)
+        map_id = self.__free_ids.pop() if self.__free_ids else len(self.__names)
+        if map_id == len(self.__names):
+            self.__names.append(None)
+            self.__maps_tags.append(None)
+        self.__ids[name] = map_id
+        self.__names[map_id] = name
+        self.__maps_tags[map_id] = set()
+        self.__all |= 1 << map_id
+        self.add_tags(name, tags)
+        self.set_favorite(name, favorite)
+        self.__sorted_names = None
+
+    def remove(self, name: str) -> None:
+        self.remove_tags(name, list(self.__maps_tags[self.__ids[name]]))
+        map_id = self.__ids.pop(name)
+        mask = ~(1 << map_id)
+        self.__all &= mask
+        self.__favorites &= mask
+        self.__names[map_id] = None
+        self.__maps_tags[map_id] = None
+        self.__free_ids.append(map_id)
+        self.__sorted_names = None
+
+    def rename(self, name: str, new_name: str) -> None:
+        map_id = self.__ids.pop(name)
+        self.__ids[new_name] = map_id
+        self.__names[map_id] = new_name
+        self.__sorted_names = None
+
+    def add_tags(self, name: str, tags: Iterable[str]) -> None:
+        map_id = self.__ids[name]
+        bit = 1 << map_id
+        for tag in tags:
+            self.__maps_tags[map_id].add(tag)
+            self.__tags[tag] = self.__tags.get(tag, 0) | bit
+
+    def remove_tags(self, name: str, tags: Iterable[str]) -> None:
+        map_id = self.__ids[name]
+        mask = ~(1 << map_id)
+        for tag in tags:
+            if tag not in self.__maps_tags[map_id]:
+                continue
+            self.__maps_tags[map_id].discard(tag)
+            bits = self.__tags[tag] & mask
+            if bits:
+                self.__tags[tag] = bits
+            else:
+                del self.__tags[tag]
+
+    def set_favorite(self, name: str, favorite: bool) -> None:
+        bit = 1 << self.__ids[name]
+        if favorite:
+            self.__favorites |= bit
+        else:
+            self.__favorites &= ~bit
+
+    def tag(self, tag: str) -> int:
+        return self.__tags.get(tag, 0)
+
+    def prefix(self, prefix: str) -> int:
+        """the maps whose name starts with prefix, ignoring case"""
+        if self.__sorted_names is None:
+            self.__sorted_names = sorted(
+                (name.lower(), map_id) for name, map_id in self.__ids.items()
+            )
+        prefix = prefix.lower()
+        bits = 0
+        start = bisect_left(self.__sorted_names, (prefix,))
+        for name, map_id in self.__sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            bits |= 1 << map_id
+        return bits
+
+    def names(self, bits: int) -> List[str]:
+        """the names of the maps in bits, sorted"""
+        if bits == 0:
+            return []
+        import numpy as np
+
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        ids = np.flatnonzero(np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little"))
+        return sorted(self.__names[map_id] for map_id in ids)
+
+
+class QueryError(ValueError):
+    pass
+
+
+class TagQuery:
+    """A boolean maps filter typed in the search box, evaluated on a TagIndex.
+
+    Words are tags, next to each other they must all match. AND, OR and NOT (in capitals) and
+    parentheses combine them, -tag excludes a tag, and the fields favorite:true,
+    favorite:false, name:<prefix> and tag:<tag> filter by the other properties of the maps.
+    e.g. "(forest OR swamp) -night favorite:true"
+    """
+
+    FIELDS = ("favorite", "name", "tag")
+    OPERATORS = ("AND", "OR", "NOT")
+
+    def __init__(self, query: str) -> None:
+        self.__tokens = self.tokenize(query)
+        self.__position = 0
+        self.__tree = self.__parse_or() if self.__tokens else ("all",)
+        if self.__position < len(self.__tokens):
+            raise QueryError(f"Unexpected '{self.__tokens[self.__position]}'")
+
+    @staticmethod
+    def tokenize(query: str) -> List[str]:
+        return re.findall(r"\(|\)|[^\s()]+", query)
+
+    @staticmethod
+    def is_filter(query: str) -> bool:
+        """whether query uses the filter syntax, plain words are a text search"""
+        for token in TagQuery.tokenize(query):
+            if token in ("(", ")") or token in TagQuery.OPERATORS or token.startswith("-"):
+                return True
+            field, _, value = token.partition(":")
+            if value and field.lower() in TagQuery.FIELDS:
+                return True
+        return False
+
+    def __peek(self) -> str | None:
+        if self.__position < len(self.__tokens):
+            return self.__tokens[self.__position]
+        return None
+
+    def __next(self) -> str:
+        token = self.__peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.__position += 1
+        return token
+
+    def __parse_or(self) -> Tuple:
+        node = self.__parse_and()
+        while self.__peek() == "OR":
+            self.__next()
+            node = ("or", node, self.__parse_and())
+        return node
+
+    def __parse_and(self) -> Tuple:
+        node = self.__parse_unary()
+        while self.__peek() not in (None, "OR", ")"):
+            if self.__peek() == "AND":
+                self.__next()
+            node = ("and", node, self.__parse_unary())
+        return node
+
+    def __parse_unary(self) -> Tuple:
+        token = self.__next()
+        if token == "NOT" or token == "-":
+            return ("not", self.__parse_unary())
+        if token.startswith("-"):
+            return ("not", self.__parse_term(token[1:]))
+        if token == "(":
+            node = self.__parse_or()
+            if self.__next() != ")":
+                raise QueryError("Expected ')'")
+            return node
+        if token in (")", "AND", "OR"):
+            raise QueryError(f"Unexpected '{token}'")
+        return self.__parse_term(token)
+
+    def __parse_term(self, token: str) -> Tuple:
+        field, _, value = token.partition(":")
+        if not value:
+            return ("tag", token.lower())
+
+        field = field.lower()
+        if field == "favorite":
+            if value.lower() not in ("true", "false"):
+                raise QueryError(f"favorite is true or false, not '{value}'")
+            return ("favorite", value.lower() == "true")
+        if field == "name":
+            return ("name", value)
+        if field == "tag":
+            return ("tag", value.lower())
+        raise QueryError(f"Unknown field '{field}'")
+
+    def evaluate(self, index: TagIndex) -> int:
+        """the bitset of the maps matching the query"""
+        return self.__evaluate(self.__tree, index)
+
+    def __evaluate(self, node: Tuple, index: TagIndex) -> int:
+        kind = node[0]
+        if kind == "and":
+            return self.__evaluate(node[1], index) & self.__evaluate(node[2], index)
+        if kind == "or":
+            return self.__evaluate(node[1], index) | self.__evaluate(node[2], index)
+        if kind == "not":
+            return index.all & ~self.__evaluate(node[1], index)
+        if kind == "tag":
+            return index.tag(node[1])
+        if kind == "favorite":
+            return index.favorites if node[1] else index.all & ~index.favorites
+        if kind == "name":
+            return index.prefix(node[1])
+        return index.all
@@ -0,0 +1,108 @@
+from typing import Iterable, List, Tuple
+from zlib import crc32
+import numpy as np
+from backend.searchers.index import TrigramIndex
+
+
+class TrigramVectors:
+    """Hashed character trigram TF-IDF vectors of a list of texts, L2 normalized.
+
+    The vectors are kept as a sparse matrix in compressed sparse column form (one column per
+    hashed trigram), so scoring a query only visits the columns of its own trigrams.
+
+    More lists of texts, about the same items, are more fields (e.g. the names and the tags of
+    the maps): every field gets its own columns, idf and normalization, and a query weighting
+    several fields is still a single pass over the matrix, see weighted_scores.
+    """
+
+    def __init__(self, *fields: List[str], dim: int = 2**18) -> None:
+        self.__dim = dim
+        self.__n = len(fields[0])
+
+        rows = []
+        columns = []
+        counts = []
+        for field, texts in enumerate(fields):
+            for row, text in enumerate(texts):
+                row_columns, row_counts = self.__hash_trigrams(text, field)
+                rows.append(np.full(len(row_columns), row, dtype=np.int32))
+                columns.append(row_columns)
+                counts.append(row_counts)
+        rows = np.concatenate(rows) if rows else np.empty(0, np.int32)
+        columns = np.concatenate(columns) if columns else np.empty(0, np.int64)
+        counts = np.concatenate(counts) if counts else np.empty(0, np.float32)
+
+        # a trigram is counted once per text, so the number of entries in a column is its df
+        df = np.bincount(columns, minlength=dim * len(fields))
+        self.__idf = (np.log((1 + self.__n) / (1 + df)) + 1).astype(np.float32)
+        values = counts * self.__idf[columns]
+
+        # every field of an item is normalized on its own
+        vectors = rows.astype(np.int64) + (columns // dim) * self.__n
+        norms = np.zeros(self.__n * len(fields), dtype=np.float32)
+        np.add.at(norms, vectors, values * values)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1
+        values = values / norms[vectors]
+
+        order = np.argsort(columns, kind="stable")
+        self.__rows = rows[order]
+        self.__values = values[order].astype(np.float32)
+        self.__indptr = np.zeros(len(df) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.__indptr[1:])
+
+    def __len__(self) -> int:
+        return self.__n
+
+    def __hash_trigrams(self, text: str, field: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        hashed = np.fromiter(
+            (crc32(gram.encode()) % self.__dim for gram in TrigramIndex.trigrams(text)),
+            dtype=np.int64,
+        )
+        # different trigrams can share a bucket
+        columns, counts = np.unique(hashed, return_counts=True)
+        return columns + field * self.__dim, counts
+
+    def scores(self, text: str, field: int = 0) -> np.ndarray:
+        """cosine similarity of text to the field of every item"""
+        return self.weighted_scores([(text, field, 1.0)])
+
+    def weighted_scores(self, queries: Iterable[Tuple[str, int, float]]) -> np.ndarray:
+        """sum of weight * cosine similarity of text to the field, for every (text, field,
+        weight) of queries, as one query vector"""
+        query_columns = []
+        query_weights = []
+        for text, field, weight in queries:
+            columns, counts = self.__hash_trigrams(text, field)
+            if len(columns) == 0:
+                continue
+            weights = counts * self.__idf[columns]
+            weights *= weight / np.sqrt(np.dot(weights, weights))
+            query_columns.append(columns)
+            query_weights.append(weights)
+        if not query_columns:
+            return np.zeros(self.__n, dtype=np.float32)
+        columns, inverse = np.unique(np.concatenate(query_columns), return_inverse=True)
+        weights = np.bincount(inverse, weights=np.concatenate(query_weights))
+
+        # the entries of all the columns at once: for every column its range in the matrix
+        starts = self.__indptr[columns]
+        lengths = self.__indptr[columns + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        entries = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+        return np.bincount(
+            self.__rows[entries],
+            weights=self.__values[entries] * np.repeat(weights, lengths),
+            minlength=self.__n,
+        ).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """indices of the k highest positive scores, best first"""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    positive = np.flatnonzero(scores > 0)
+    if len(positive) > k:
+        positive = positive[np.argpartition(-scores[positive], k - 1)[:k]]
+    # ties keep the original order
+    return positive[np.argsort(-scores[positive], kind="stable")]
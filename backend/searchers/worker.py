@@ -0,0 +1,118 @@
+from typing import TYPE_CHECKING, Callable, List, NamedTuple
+from threading import Condition, Thread
+from time import monotonic
+import traceback
+from tools.tracing import span
+
+if TYPE_CHECKING:
+    # the searchers and their NumPy are imported by the factory creating them
+    from backend.searchers.searchers import Searcher
+
+
+class SearchResult(NamedTuple):
+    generation: int
+    query: str
+    matches: List[str]
+
+
+class SearchWorker:
+    """Runs the searches of a searcher on a background thread, so typing never waits for them.
+
+    Every submitted query gets a new generation and replaces the pending one. A query is
+    searched once no newer query arrived for debounce seconds, and its result is dropped if a
+    newer query was submitted meanwhile. on_result is called on the worker thread.
+
+    inline searches on the thread submitting the query instead, with no debounce, so a result
+    always comes back during the same frame (recorded and replayed sessions need that).
+    """
+
+    def __init__(
+        self,
+        searcher: "Searcher",
+        on_result: Callable[[SearchResult], None],
+        debounce: float = 0.15,
+        inline: bool = False,
+    ) -> None:
+        self.__searcher = searcher
+        self.__on_result = on_result
+        self.__debounce = debounce
+        self.__condition = Condition()
+        self.__generation = 0
+        # (generation, query, due time) of the query waiting for the worker
+        self.__pending = None
+        self.__running = True
+        self.__inline = inline
+        self.__thread = None
+        if not inline:
+            self.__thread = Thread(target=self.__run, name="search worker", daemon=True)
+            self.__thread.start()
+
+    @property
+    def generation(self) -> int:
+        return self.__generation
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.__generation
+
+    def submit(self, query: str, immediate: bool = False) -> int:
+        """search query after the debounce delay (now if immediate), returns its generation"""
+        if self.__inline:
+            self.__generation += 1
+            self.__search(self.__generation, query)
+            return self.__generation
+        with self.__condition:
+            self.__generation += 1
+            delay = 0.0 if immediate else self.__debounce
+            self.__pending = (self.__generation, query, monotonic() + delay)
+            self.__condition.notify()
+            return self.__generation
+
+    def cancel(self) -> None:
+        """drop the pending query and the result of a running one"""
+        with self.__condition:
+            self.__generation += 1
+            self.__pending = None
+
+    def stop(self, timeout: float = 1.0) -> None:
+        with self.__condition:
+            self.__running = False
+            self.__pending = None
+            self.__condition.notify()
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+    def __next_query(self) -> tuple | None:
+        with self.__condition:
+            while self.__running:
+                if self.__pending is None:
+                    self.__condition.wait()
+                    continue
+                remaining = self.__pending[2] - monotonic()
+                if remaining <= 0:
+                    pending = self.__pending
+                    self.__pending = None
+                    return pending
+                # a newer query wakes the worker and restarts the delay
+                self.__condition.wait(remaining)
+        return None
+
+    def __run(self) -> None:
+        while True:
+            pending = self.__next_query()
+            if pending is None:
+                return
+
+            generation, query, _ = pending
+            self.__search(generation, query)
+
+    def __search(self, generation: int, query: str) -> None:
+        try:
+            with span("search worker", "search", query=query):
+                matches = self.__searcher.search(query)
+        except Exception:
+            # a failed search must not stop the searches that follow
+            traceback.print_exc()
+            return
+
+        if self.is_current(generation):
+            self.__on_result(SearchResult(generation, query, matches))
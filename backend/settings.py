@@ -62,6 +62,9 @@ class Settings:
         ...
 
     def get(self, name: str, subname: str = None, default: Any = None) -> Any:
+        if name not in self.__settings:
+            # a settings file from before the setting was added
+            return default
         if subname is None:
             return self.__settings[name].value
         else:
@@ -0,0 +1,49 @@
+from typing import Iterable, List
+import re
+import unicodedata
+
+# letters and digits, joined by an apostrophe or an ampersand ("captain's", "d&d")
+WORD_PATTERN = re.compile(r"[^\W_]+(?:['&][^\W_]+)*")
+VOWELS = set("aeiouy")
+
+
+def normalize(text: str) -> str:
+    """casefolded, without accents and surrounding spaces ("Café " -> "cafe")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.casefold().strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """the normalized words of text, punctuation dropped"""
+    return WORD_PATTERN.findall(normalize(text))
+
+
+def _has_vowel(word: str) -> bool:
+    return any(c in VOWELS for c in word)
+
+
+def stem(word: str) -> str:
+    """strips plural and verb endings of a normalized word ("ruins", "ruined" -> "ruin"),
+    a few suffix rules instead of a full stemmer, enough to match forms of the same tag"""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    for suffix in ("sses", "ches", "shes", "xes"):
+        if word.endswith(suffix):
+            return word[:-2]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and _has_vowel(word[: -len(suffix)]):
+            word = word[: -len(suffix)]
+            # running -> run
+            if len(word) > 2 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            return word
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def stems(words: Iterable[str]) -> List[str]:
+    return [stem(word) for word in words]
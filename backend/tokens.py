@@ -6,8 +6,9 @@ from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
 import io
 import pygame as pg
-import cv2
-import numpy as np
+from backend.searchers.synonyms import SynonymsTable, tokens_synonyms_path
+from backend.text import tokenize
+from tools.tracing import traced
 
 
 class Token:
@@ -31,6 +32,10 @@ class Token:
         return self.__token
 
     def __remove_background(self, path: str) -> io.BytesIO:
+        # the tokens manager is created on demand, so are its OpenCV and NumPy
+        import cv2
+        import numpy as np
+
         img = cv2.imread(path)
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         mask = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY)[1]
@@ -66,17 +71,32 @@ class TokensManager:
         self.__tokens_dir = str(Path(tokens_dir).resolve())
         self.__tokens = self.__load_tokens(self.__tokens_dir)
         self.__tokens_names = sorted(self.__tokens.keys())
+        self.__synonyms = self.__load_synonyms(tokens_synonyms_path(self.__tokens_dir))
 
     @property
     def tokens_names(self) -> List[str]:
         return self.__tokens_names
 
+    @property
+    def synonyms(self) -> SynonymsTable:
+        return self.__synonyms
+
+    def __load_synonyms(self, synonyms_file: str) -> SynonymsTable:
+        synonyms = SynonymsTable(synonyms_file)
+        # normally built by tools/synonymsBuilder.py, the words of new tokens are added once
+        words = {word for name in self.__tokens_names for word in tokenize(name)}
+        if synonyms.update(words):
+            synonyms.save()
+        return synonyms
+
+    @traced("TokensManager.worker_load_tokens", "tokens")
     def __worker_load_tokens(self, chunk: List[str], result: Queue) -> None:
         for token_path in chunk:
             token_name = Path(token_path).stem.title()
             token = Token(token_name, token_path)
             result.put(token)
 
+    @traced("TokensManager.load_tokens", "tokens")
     def __load_tokens(self, tokens_dir: str) -> Dict[str, Token]:
         tokens_paths = list(Path(tokens_dir).glob("*.png"))
         tokens_paths = [str(path.resolve()) for path in tokens_paths]
@@ -0,0 +1,28 @@
+import json
+import pygame
+
+
+class Atlas:
+    """pre-scaled thumbnails packed into a few pages, built by tools/atlasBuilder.py"""
+
+    def __init__(self, json_config):
+        with open(json_config, "r") as f:
+            dic = json.load(f)
+        self.pages = []
+        for path in dic['pages']:
+            page = pygame.image.load(path)
+            if pygame.display.get_surface():
+                page = page.convert_alpha()
+            self.pages.append(page)
+        self.sections = {
+            'maps': dic.get('maps', {}),
+            'tokens': dic.get('tokens', {}),
+        }
+
+    def get(self, section, name):
+        """returns (page surface, area rect) of the thumbnail or None if it was not packed"""
+        entry = self.sections[section].get(name)
+        if entry is None:
+            return None
+        page, rect = entry
+        return self.pages[page], rect
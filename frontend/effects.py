@@ -2,6 +2,7 @@ from typing import Tuple
 import pygame
 from random import randint
 from backend.settings import Controls
+from tools.tracing import span
 
 
 class Effects(list):
@@ -10,11 +11,17 @@ class Effects(list):
             effect.handle_pygame_events(event)
     def step(self):
         for effect in self:
-            effect.step()
+            with span(type(effect).__name__ + ".step", "effects", effect=effect.name):
+                effect.step()
 
     def draw(self):
         for effect in self:
-            effect.draw()
+            with span(type(effect).__name__ + ".draw", "effects", effect=effect.name):
+                effect.draw()
+
+    @property
+    def animated(self) -> bool:
+        return any(effect.animated for effect in self)
 
 
 class Effect:
@@ -23,6 +30,8 @@ class Effect:
         self.win = win
         self.surf = None
         self.controls = controls
+        # changes every frame by itself, keeps the loop at the active frame rate
+        self.animated = False
 
     def handle_pygame_events(self, event):
         pass
@@ -136,6 +145,7 @@ def screen(win, color):
 class Rain(Effect):
     def __init__(self, win: pygame.Surface, controls: Controls) -> None:
         super().__init__(win, controls)
+        self.animated = True
         self.particles = []
         self.max_particles = 100
 
@@ -1,5 +1,6 @@
 import json
 import pygame
+from tools.utils import LRUCache
 
 class Font:
     def __init__(self, json_config):
@@ -7,6 +8,10 @@ class Font:
             dic = json.load(f)
         self.atlas = pygame.image.load(dic['path'])
         self.cords = dic['coords']
+        # rendered strings, keyed by (text, color)
+        self.cache = LRUCache(maxsize=256)
+        # atlas copies tinted once per color
+        self.tinted_atlases = {}
     def resize(self, height):
         ratio = height / self.atlas.get_height()
         new_width = ratio * self.atlas.get_width()
@@ -18,21 +23,35 @@ class Font:
                 new_rect.append((pair[0] * ratio, pair[1] * ratio))
             new_cords.append(new_rect)
         self.cords = new_cords
+        self.cache.clear()
+        self.tinted_atlases = {}
+    def get_atlas(self, color):
+        if color is None:
+            return self.atlas
+        if len(color) == 3:
+            color = (color[0], color[1], color[2], 0)
+        color = tuple(color)
+        atlas = self.tinted_atlases.get(color)
+        if atlas is None:
+            atlas = self.atlas.copy()
+            atlas.fill(color, special_flags=pygame.BLEND_RGBA_ADD)
+            self.tinted_atlases[color] = atlas
+        return atlas
     def render(self, text, antialiasing=False, color=None):
+        key = (text, tuple(color) if color is not None else None)
+        surf = self.cache.get(key)
+        if surf is None:
+            surf = self.render_uncached(text, color)
+            self.cache.put(key, surf)
+        return surf
+    def render_uncached(self, text, color=None):
         height = self.cords[0][1][1]
         space_size = height / 4
         tracking = 0
-        size = [0, height]
-        for c in text:
-            if c == ' ':
-                char_size = space_size
-            else:
-                index = ord(c) - ord('!')
-                char_size = self.cords[index][1][0]
-            
-            size[0] += char_size + tracking
-        
-        surf = pygame.Surface(size, pygame.SRCALPHA)
+        atlas = self.get_atlas(color)
+
+        # one pass to place the glyphs, one batched blit to draw them
+        glyphs = []
         offset = 0
         for c in text:
             if c == ' ':
@@ -40,14 +59,12 @@ class Font:
             else:
                 index = ord(c) - ord('!')
                 char_size = self.cords[index][1][0]
-                surf.blit(self.atlas, (offset, 0), self.cords[index])
+                # glyphs don't overlap, max against the empty surface copies the tinted pixels as is
+                glyphs.append((atlas, (offset, 0), self.cords[index], pygame.BLEND_RGBA_MAX))
             offset += char_size + tracking
 
-        if len(color) == 3:
-            color = (color[0], color[1], color[2], 0)
-        
-        surf.fill(color, special_flags=pygame.BLEND_RGBA_ADD)
-        
+        surf = pygame.Surface((offset, height), pygame.SRCALPHA)
+        surf.blits(glyphs, doreturn=False)
         return surf
         
         
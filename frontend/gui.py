@@ -1,7 +1,9 @@
 import pygame
 from enum import Enum
 from typing import Any
+from collections import OrderedDict
 #from tools.profilers import time_profiler
+from tools.utils import LRUCache
 import json
 
 
@@ -32,6 +34,33 @@ class GUI:
 
     default_text_color = None
 
+    # rendered and framed text surfaces shared by Label, Button and TextBox.
+    # cached surfaces are shared, never draw on them
+    text_cache = LRUCache(maxsize=256)
+
+    # retained mode: elements mark the screen rects they changed, render_overlay redraws
+    # only those into the overlay, which keeps the last drawn gui
+    overlay: pygame.Surface = None
+    dirty_rects = []
+    max_dirty_rects = 32
+    last_focused_element = None
+    elements_snapshot = ()
+
+    # containers that changed since the last layout pass
+    layout_queue = []
+
+    # hover is resolved on mouse motion against a grid of the interactive elements on screen
+    hit_index = {}
+    hit_index_cell = 128
+    hit_index_dirty = True
+    # elements that have to be stepped every frame (e.g. a blinking cursor)
+    animated = set()
+
+    # elements draw at their screen position minus draw_origin. while a scroll container renders
+    # its tiles (see TileCache) GUI.win is the tile and window_rect is the real window
+    draw_origin = (0, 0)
+    window_rect = None
+
     debug = False
 
     def initialize(json_path: str):
@@ -52,8 +81,12 @@ class GUI:
         GUI.default_text_color = GUI.gui_config['default_text_color']
 
     def event_handle(event):
+        if event.type == pygame.MOUSEMOTION:
+            GUI.update_hover(event.pos)
+
         # pygame left click
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            GUI.update_hover(event.pos)
             if GUI.focused_element:
                 for element in GUI.elements:
                     if element is GUI.focused_element:
@@ -85,6 +118,10 @@ class GUI:
                 character = event.unicode
                 GUI.active_element.type_character(character)
 
+        # window content lost or resized, everything has to be presented again
+        if event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+            GUI.invalidate()
+
     def get_font_at(index):
         if len(GUI.fonts) == 0:
             raise NoFonts
@@ -94,20 +131,135 @@ class GUI:
             return GUI.fonts[0]
 
     def step():
-        GUI.focused_element = None
-        for element in GUI.elements:
-            element.step()
+        if GUI.gui_scroll_event[1] != 0:
+            for element in GUI.elements:
+                element.scroll(GUI.gui_scroll_event[1])
         GUI.gui_scroll_event = (0, 0)
 
+        GUI.layout()
+        for element in list(GUI.animated):
+            element.step()
+
+        GUI.check_elements()
+        if GUI.hit_index_dirty:
+            # things moved under a still mouse
+            GUI.update_hover(pygame.mouse.get_pos())
+
+    def check_elements():
+        # menus are also swapped by editing GUI.elements directly
+        elements_snapshot = tuple(GUI.elements)
+        if elements_snapshot != GUI.elements_snapshot:
+            GUI.elements_snapshot = elements_snapshot
+            GUI.hit_index_dirty = True
+            GUI.invalidate()
+
+    def rebuild_hit_index():
+        GUI.layout()
+        targets = []
+        for element in GUI.elements:
+            element.collect_hit_targets(targets)
+
+        cell = GUI.hit_index_cell
+        window_rect = GUI.get_window_rect()
+        GUI.hit_index = {}
+        for order, (rect, element) in enumerate(targets):
+            visible = rect.clip(window_rect)
+            if visible.width == 0 or visible.height == 0:
+                continue
+            for x in range(visible.left // cell, (visible.right - 1) // cell + 1):
+                for y in range(visible.top // cell, (visible.bottom - 1) // cell + 1):
+                    GUI.hit_index.setdefault((x, y), []).append((order, rect, element))
+        GUI.hit_index_dirty = False
+
+    def hit_test(pos):
+        """the interactive element under pos, the last drawn one wins"""
+        GUI.check_elements()
+        if GUI.hit_index_dirty:
+            GUI.rebuild_hit_index()
+        cell = GUI.hit_index_cell
+        found = None
+        found_order = -1
+        for order, rect, element in GUI.hit_index.get((pos[0] // cell, pos[1] // cell), ()):
+            if (
+                order > found_order
+                and pos[0] > rect.left
+                and pos[0] < rect.right
+                and pos[1] > rect.top
+                and pos[1] < rect.bottom
+            ):
+                found = element
+                found_order = order
+        return found
+
+    def update_hover(pos):
+        GUI.focused_element = GUI.hit_test(pos)
+
+        # hover changed: redraw the element that lost it and the one that got it
+        if GUI.focused_element is not GUI.last_focused_element:
+            if GUI.last_focused_element:
+                GUI.last_focused_element.mark_dirty()
+            if GUI.focused_element:
+                GUI.focused_element.mark_dirty()
+            GUI.last_focused_element = GUI.focused_element
+
     def draw():
+        GUI.layout()
         for element in GUI.elements:
             element.draw()
 
+    def get_window_rect() -> pygame.Rect:
+        if GUI.window_rect:
+            return GUI.window_rect
+        return GUI.win.get_rect()
+
+    def layout():
+        """deferred layout pass: lay out every container that changed, once"""
+        while GUI.layout_queue:
+            queue = GUI.layout_queue
+            GUI.layout_queue = []
+            for element in queue:
+                element.layout_pending = False
+                element.layout()
+
+    def invalidate(rect=None):
+        """mark a screen rect (default: the whole window) to be redrawn by render_overlay"""
+        window_rect = GUI.get_window_rect()
+        rect = window_rect if rect is None else pygame.Rect(rect).clip(window_rect)
+        if rect.width == 0 or rect.height == 0:
+            return
+        GUI.dirty_rects.append(rect)
+        if len(GUI.dirty_rects) > GUI.max_dirty_rects:
+            GUI.dirty_rects = [GUI.dirty_rects[0].unionall(GUI.dirty_rects[1:])]
+
+    def render_overlay():
+        """retained mode: redraw the dirty parts of the gui into GUI.overlay.
+        returns the screen rects that changed since the last call"""
+        size = GUI.win.get_size()
+        if GUI.overlay is None or GUI.overlay.get_size() != size:
+            GUI.overlay = pygame.Surface(size, pygame.SRCALPHA)
+            GUI.dirty_rects = [GUI.overlay.get_rect()]
+        if len(GUI.dirty_rects) == 0:
+            return []
+
+        rects = GUI.dirty_rects
+        GUI.dirty_rects = []
+
+        win = GUI.win
+        GUI.win = GUI.overlay
+        GUI.overlay.set_clip(rects[0].unionall(rects[1:]))
+        GUI.overlay.fill((0, 0, 0, 0))
+        GUI.draw()
+        GUI.overlay.set_clip(None)
+        GUI.win = win
+        return rects
+
     def append(element):
         GUI.elements.append(element)
+        element.mark_dirty()
 
     def remove(element):
         GUI.elements.remove(element)
+        element.mark_dirty()
 
     def get_values():
         values = {}
@@ -120,10 +272,18 @@ class Element:
     """Gui Element base class"""
 
     def __init__(self):
+        # cached position on screen, see get_abs_pos
+        self._abs_pos = None
+        self._parent = None
+        self.layout_pending = False
         self.pos = (0, 0)
         self.size = (0, 0)
         self.parent = None
         self.frame = None
+        # screen rect the content of a scroll container is seen through, None for the window
+        self.viewport = None
+        # rendered content of a scroll container, see TileCache
+        self.tiles = None
         self.debug_color = (255, 255, 255)
         self.debug = True
         self.name = ""
@@ -131,13 +291,97 @@ class Element:
         self.send_event_on_no_click = False
         self.use_parents_size = False
 
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos):
+        self._pos = pos
+        self.invalidate_abs_pos()
+        GUI.hit_index_dirty = True
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        self._parent = parent
+        self.invalidate_abs_pos()
+
+    def get_children(self):
+        return ()
+
+    def invalidate_abs_pos(self):
+        # a cached child implies a cached parent, so an invalid element has invalid children
+        if self._abs_pos is None:
+            return
+        self._abs_pos = None
+        for child in self.get_children():
+            child.invalidate_abs_pos()
+
+    def request_layout(self):
+        """lay out the children in the next GUI.layout pass"""
+        if not self.layout_pending:
+            self.layout_pending = True
+            GUI.layout_queue.append(self)
+
+    def layout(self):
+        pass
+
+    def scroll(self, dy):
+        for child in self.get_children():
+            child.scroll(dy)
+
+    def collect_hit_targets(self, targets):
+        """append (screen rect, element to focus) for the interactive elements, in drawing order"""
+        if self.tiles is None:
+            for child in self.get_children():
+                child.collect_hit_targets(targets)
+            return
+
+        # content outside the viewport is clipped away, it cannot be hovered
+        viewport = self.get_viewport()
+        children_targets = []
+        for child in self.get_children():
+            child.collect_hit_targets(children_targets)
+        for rect, element in children_targets:
+            rect = rect.clip(viewport)
+            if rect.width > 0 and rect.height > 0:
+                targets.append((rect, element))
+
+    def get_viewport(self) -> pygame.Rect:
+        window_rect = GUI.get_window_rect()
+        if self.viewport is None:
+            return window_rect
+        return pygame.Rect(self.viewport).clip(window_rect)
+
+    def get_local_view(self) -> pygame.Rect:
+        """the part of the element seen through the viewport, relative to the element"""
+        pos = self.get_abs_pos()
+        view = self.get_viewport().move(-pos[0], -pos[1])
+        return view.clip(pygame.Rect((0, 0), self.size))
+
+    def use_tiles(self):
+        """scrollable containers draw their content from cached tiles"""
+        if self.tiles is None:
+            self.tiles = TileCache(self)
+            GUI.hit_index_dirty = True
+
+    def draw_content(self, rect):
+        """draw the children that touch rect (screen coordinates)"""
+        for child in self.get_children():
+            if child.get_dirty_rect().colliderect(rect):
+                child.draw()
+
     def step(self):
         pass
 
     def draw(self):
         if GUI.debug and self.debug:
             pygame.draw.rect(
-                GUI.win, self.debug_color, (self.get_abs_pos(), self.size), 1
+                GUI.win, self.debug_color, (self.get_draw_pos(), self.size), 1
             )
         if self.frame:
             self.frame.draw(self)
@@ -153,15 +397,51 @@ class Element:
 
     def set_size(self, size):
         self.size = size
+        GUI.hit_index_dirty = True
 
     def get_size(self):
         return self.size
 
+    def get_dirty_rect(self):
+        """screen rect covered by the element and its frame"""
+        pos = self.get_abs_pos()
+        rect = pygame.Rect(pos, self.size)
+        if self.frame:
+            rect.union_ip(
+                pygame.Rect(
+                    pos[0] - self.frame.margin_left,
+                    pos[1] - self.frame.margin_top,
+                    self.size[0] + self.frame.margin_left + self.frame.margin_right,
+                    self.size[1] + self.frame.margin_top + self.frame.margin_bottom,
+                )
+            )
+        return rect
+
+    def mark_dirty(self):
+        """the element looks different, redraw it on the next retained frame"""
+        if GUI.win:
+            rect = self.get_dirty_rect()
+            # the tiles of the scroll containers holding the element are stale too
+            ancestor = self.parent
+            while ancestor is not None:
+                if ancestor.tiles is not None:
+                    ancestor.tiles.invalidate(rect)
+                ancestor = ancestor.parent
+            GUI.invalidate(rect)
+
     def get_abs_pos(self):
-        if self.parent is None:
-            return self.pos
-        parent_pos = self.parent.get_abs_pos()
-        return (parent_pos[0] + self.pos[0], parent_pos[1] + self.pos[1])
+        if self._abs_pos is None:
+            if self.parent is None:
+                self._abs_pos = self.pos
+            else:
+                parent_pos = self.parent.get_abs_pos()
+                self._abs_pos = (parent_pos[0] + self.pos[0], parent_pos[1] + self.pos[1])
+        return self._abs_pos
+
+    def get_draw_pos(self):
+        """position on GUI.win, which is not the window while rendering offscreen"""
+        pos = self.get_abs_pos()
+        return (pos[0] - GUI.draw_origin[0], pos[1] - GUI.draw_origin[1])
     
     def get_values(self):
         return {}
@@ -176,6 +456,9 @@ class Elements(Element):
         element.parent = self
         self.elements.append(element)
 
+    def get_children(self):
+        return self.elements
+
     def draw(self):
         super().draw()
         for element in self.elements:
@@ -210,20 +493,26 @@ class Label(Element):
         self.font = font
         if not self.font:
             self.font = GUI.fonts[0]
-        self.surf = self.font.render(self.text, True, GUI.default_text_color)
+        self.surf = render_text(self.text, self.font, GUI.default_text_color)
         self.size = self.surf.get_size()
 
         self.debug_color = (0, 255, 0)
 
     def draw(self):
         super().draw()
-        pos = self.get_abs_pos()
+        pos = self.get_draw_pos()
         center = (
             pos[0] + self.size[0] // 2 - self.surf.get_width() // 2,
             pos[1] + self.size[1] // 2 - self.surf.get_height() // 2,
         )
         GUI.win.blit(self.surf, center)
 
+def render_text(text, font, color) -> pygame.Surface:
+    """font.render through GUI.text_cache"""
+    key = ("text", text, font, tuple(color))
+    return GUI.text_cache.get_or_create(key, lambda: font.render(text, True, color))
+
+
 def gui_art_around_text(text_surf: pygame.Surface, square='square1', custom_width=-1, appendix: pygame.Surface=None) -> pygame.Surface:
     surf = text_surf
     art = GUI.gui_config[square]
@@ -269,8 +558,21 @@ class Button(Element):
         self.event = {"key": self.key, "text": self.text, "element": self}
         self.use_parents_size = True
 
+    def set_text(self, text):
+        self.text = text
+        self.surf = self.render(self.text, self.font, GUI.default_text_color)
+        self.surf_selected = self.render(self.text, self.font, GUI.default_text_color, True)
+        self.event["text"] = self.text
+        self.mark_dirty()
+
     def render(self, text, font, color, selected=False):
-        rendered_text = font.render(text, True, color)
+        key = ("button", text, font, tuple(color), self.custom_width, selected)
+        return GUI.text_cache.get_or_create(
+            key, lambda: self.render_framed(text, font, color, selected)
+        )
+
+    def render_framed(self, text, font, color, selected=False):
+        rendered_text = render_text(text, font, color)
         if self.custom_width != -1:
             surf = pygame.Surface(
                 (self.custom_width, rendered_text.get_height()), pygame.SRCALPHA
@@ -282,22 +584,12 @@ class Button(Element):
         framed = gui_art_around_text(surf, 'square1' if not selected else 'square2')
         return framed
 
-    def step(self):
-        super().step()
-        mouse_pos = pygame.mouse.get_pos()
-        # if mouse on button
-        pos = self.get_abs_pos()
-        if (
-            mouse_pos[0] > pos[0]
-            and mouse_pos[0] < pos[0] + self.size[0]
-            and mouse_pos[1] > pos[1]
-            and mouse_pos[1] < pos[1] + self.size[1]
-        ):
-            GUI.focused_element = self
+    def collect_hit_targets(self, targets):
+        targets.append((self.get_dirty_rect(), self))
 
     def draw(self):
         super().draw()
-        pos = self.get_abs_pos()
+        pos = self.get_draw_pos()
         center = (
             pos[0] + self.size[0] // 2 - self.surf.get_width() // 2,
             pos[1],
@@ -327,7 +619,7 @@ class TextBox(Element):
             self.font = GUI.fonts[0]
         self.custom_width = custom_width
         self.cursor_on = False
-        self.cursor_surf = self.font.render("|", True, GUI.default_text_color)
+        self.cursor_surf = render_text("|", self.font, GUI.default_text_color)
         self.surf = self.render(initial_text)
         
         self.size = self.surf.get_size()
@@ -339,11 +631,14 @@ class TextBox(Element):
 
     def start_typing(self):
         self.typing = True
+        # blink the cursor every frame while typing
+        GUI.animated.add(self)
         self.timer = self.time_interval
         self.refresh()
 
     def stop_typing(self):
         self.typing = False
+        GUI.animated.discard(self)
         self.timer = 0
         self.cursor_on = False
         self.refresh()
@@ -352,6 +647,10 @@ class TextBox(Element):
         GUI.gui_event_handler({"key": self.key, "text": self.text, "state": "done"})
 
     def type_character(self, char):
+        if char in ("\r", "\n"):
+            # enter finishes typing like clicking outside the textbox
+            self.stop_typing()
+            return
         if char == "\x08":
             if len(self.text) > 0:
                 self.text = self.text[:-1]
@@ -368,11 +667,16 @@ class TextBox(Element):
             self.stop_typing()
 
     def render(self, text):
-        text_surf = self.font.render(text, True, GUI.default_text_color)
+        key = ("textbox", text, self.font, tuple(GUI.default_text_color), self.custom_width, self.cursor_on)
+        return GUI.text_cache.get_or_create(key, lambda: self.render_framed(text))
+
+    def render_framed(self, text):
+        text_surf = render_text(text, self.font, GUI.default_text_color)
         surf = gui_art_around_text(text_surf, 'square1', self.custom_width, self.cursor_surf if self.cursor_on else None)
         return surf
 
     def refresh(self):
+        self.mark_dirty()
         if not self.typing:
             text = ""
             if self.text != "":
@@ -384,19 +688,11 @@ class TextBox(Element):
         text = self.text
         self.surf = self.render(text)
 
+    def collect_hit_targets(self, targets):
+        targets.append((pygame.Rect(self.get_abs_pos(), self.size), self))
+
     def step(self):
         super().step()
-        mouse_pos = pygame.mouse.get_pos()
-        # if mouse on button
-        pos = self.get_abs_pos()
-        if (
-            mouse_pos[0] > pos[0]
-            and mouse_pos[0] < pos[0] + self.size[0]
-            and mouse_pos[1] > pos[1]
-            and mouse_pos[1] < pos[1] + self.size[1]
-        ):
-            GUI.focused_element = self
-
         if self.typing:
             self.timer -= 1
             if self.timer == 0:
@@ -406,7 +702,7 @@ class TextBox(Element):
 
     def draw(self):
         super().draw()
-        pos = self.get_abs_pos()
+        pos = self.get_draw_pos()
         alignment = (pos[0], pos[1])
         if self.alignment == "c":
             alignment = (
@@ -419,8 +715,6 @@ class TextBox(Element):
                 pos[1],
             )
         GUI.win.blit(self.surf, alignment)
-        if self.cursor_on:
-            self.refresh()
 
     def get_values(self):
         return {self.key: self.text}
@@ -447,67 +741,71 @@ class StackPanel(Element):
     def append(self, element):
         element.parent = self
         self.elements.append(element)
+        margin = self.margin if len(self.elements) > 1 else 0
+        # the size grows here, the children are placed in the next layout pass
         if self.orientation == StackPanel.VERTICAL:
             self.size = (
                 max(self.size[0], element.size[0]),
-                self.size[1] + element.size[1] + self.margin,
+                self.size[1] + margin + element.size[1],
             )
-
-            height_offset = 0
-            for element in self.elements:
-                element.pos = (0, height_offset)
-                element.set_size((self.size[0], element.size[1]))
-                height_offset += element.size[1] + self.margin
-
-            self.size = (self.size[0], height_offset - self.margin)
-
         else:
             self.size = (
-                self.size[0] + element.size[0] + self.margin,
+                self.size[0] + margin + element.size[0],
                 max(self.size[1], element.size[1]),
             )
+        self.request_layout()
 
-            width_offset = 0
-            for element in self.elements:
-                element.pos = (width_offset, 0)
-                element.set_size((element.size[0], self.size[1]))
-                width_offset += element.size[0] + self.margin
+    def get_children(self):
+        return self.elements
 
-            self.size = (width_offset - self.margin, self.size[1]) 
+    def layout(self):
+        offset = 0
+        for element in self.elements:
+            if self.orientation == StackPanel.VERTICAL:
+                element.pos = (0, offset)
+                element.set_size((self.size[0], element.size[1]))
+                offset += element.size[1] + self.margin
+            else:
+                element.pos = (offset, 0)
+                element.set_size((element.size[0], self.size[1]))
+                offset += element.size[0] + self.margin
+        if self.tiles:
+            self.tiles.clear()
+        self.mark_dirty()
 
     def set_size(self, size):
         self.size = size
-        for e in self.elements:
-            if self.orientation == StackPanel.VERTICAL:
-                e.set_size((size[0], e.size[1]))
-            else:
-                e.set_size((e.size[0], size[1]))
+        self.request_layout()
 
-    def step(self):
-        super().step()
-        if self.scrollable and GUI.gui_scroll_event[1] != 0:
-            self.pos = (self.pos[0], self.pos[1] + GUI.gui_scroll_event[1] * 50)
+    def scroll(self, dy):
+        if self.scrollable:
+            self.mark_dirty()
+            self.pos = (self.pos[0], self.pos[1] + dy * 50)
             if self.scroll_limit_upper and self.pos[1] > self.scroll_limit_upper:
                 self.pos = (self.pos[0], self.scroll_limit_upper)
             if self.scroll_limit_lower and self.pos[1] < self.scroll_limit_lower:
                 self.pos = (self.pos[0], self.scroll_limit_lower)
+            self.mark_dirty()
+        super().scroll(dy)
+
+    def collect_hit_targets(self, targets):
+        # hovering anywhere on the panel focuses the linked button
         if self.linked_button:
-            mouse_pos = pygame.mouse.get_pos()
-            # if mouse on button
-            pos = self.get_abs_pos()
-            if (
-                mouse_pos[0] > pos[0]
-                and mouse_pos[0] < pos[0] + self.size[0]
-                and mouse_pos[1] > pos[1]
-                and mouse_pos[1] < pos[1] + self.size[1]
-            ):
-                GUI.focused_element = self.linked_button
+            targets.append((pygame.Rect(self.get_abs_pos(), self.size), self.linked_button))
+        super().collect_hit_targets(targets)
+
+    def step(self):
+        super().step()
         for element in self.elements:
             element.step()
 
     def draw(self):
-        for element in self.elements:
-            element.draw()
+        if self.scrollable:
+            self.use_tiles()
+            self.tiles.draw()
+        else:
+            for element in self.elements:
+                element.draw()
         super().draw()
 
     def click(self):
@@ -547,26 +845,275 @@ class Columns(StackPanel):
         self.elements.append(element)
         element.parent = self
 
-        x = 0
-        y = 0
+        # only complete rows count for the height
+        cols = min(len(self.elements), self.cols)
+        rows = len(self.elements) // self.cols
+        self.size = (
+            cols * (self.element_size[0] + self.hor_margin) - self.hor_margin,
+            rows * (self.element_size[1] + self.ver_margin) - self.ver_margin,
+        )
+        self.request_layout()
 
-        size_x = 0
-        size_y = 0
+    def layout(self):
         for i, e in enumerate(self.elements):
-            e.pos = (x, y)
+            row, col = divmod(i, self.cols)
+            e.pos = (
+                col * (self.element_size[0] + self.hor_margin),
+                row * (self.element_size[1] + self.ver_margin),
+            )
             e.set_size(self.element_size)
-            x += self.element_size[0] + self.hor_margin
-            size_x = max(x, size_x)
-            if (i + 1) % self.cols == 0:
-                x = 0
-                y += self.element_size[1] + self.ver_margin
-                size_y = max(y, size_y)
-        self.size = (size_x - self.hor_margin, size_y - self.ver_margin)
+        if self.tiles:
+            self.tiles.clear()
+        self.mark_dirty()
 
     def set_size(self, size):
         self.size = size
 
 
+class VirtualColumns(Element):
+    """grid container for long lists of items. only the rows inside the window are created,
+    stepped and drawn. create_cell(item) builds a new cell, bind_cell(cell, item) points an
+    existing cell at another item.
+    cells are pooled by key(item): when the items change (e.g. new search results) or rows
+    scroll back into view, an item that already has a cell gets it back as is, and only
+    items never seen before take a new cell or rebind the least recently used pooled one"""
+
+    def __init__(self, cols, create_cell, bind_cell, key=None, max_pooled_cells=256):
+        super().__init__()
+        self.cols = cols
+        self.create_cell = create_cell
+        self.bind_cell = bind_cell
+        self.key = key if key else lambda item: item
+        self.max_pooled_cells = max_pooled_cells
+        self.items = []
+        self.hor_margin = 10
+        self.ver_margin = 10
+
+        # all cells share the size of the first one, like Columns
+        self.element_size = None
+        # item index -> cell showing it
+        self.cells = {}
+        # item key -> cell, for cells that are not on screen. least recently used first
+        self.pool = OrderedDict()
+        self.visible_range = None
+
+        self.scrollable = False
+        self.scroll_limit_lower = None
+        self.scroll_limit_upper = None
+        self.debug_color = (255, 255, 0)
+        self.debug = False
+
+    def set_items(self, items):
+        self.mark_dirty()
+        self.items = list(items)
+        self.visible_range = None
+        if self.tiles:
+            self.tiles.clear()
+
+        if self.element_size is None and len(self.items) > 0:
+            item = self.items[0]
+            cell = self.create_cell(item)
+            self.element_size = cell.size
+            cell.item_key = self.key(item)
+            cell.parent = self
+            self.pool[cell.item_key] = cell
+
+        self.size = (0, 0)
+        if len(self.items) > 0:
+            rows = (len(self.items) + self.cols - 1) // self.cols
+            cols = min(len(self.items), self.cols)
+            self.size = (
+                cols * (self.element_size[0] + self.hor_margin) - self.hor_margin,
+                rows * (self.element_size[1] + self.ver_margin) - self.ver_margin,
+            )
+        self.update_visible_cells()
+
+    def set_size(self, size):
+        self.size = size
+
+    def get_children(self):
+        return self.cells.values()
+
+    def get_visible_range(self):
+        """range of items indices of the rows inside the viewport"""
+        if len(self.items) == 0:
+            return (0, 0)
+        row_height = self.element_size[1] + self.ver_margin
+        rows = (len(self.items) + self.cols - 1) // self.cols
+        view = self.get_local_view()
+        if self.tiles:
+            # a tile is rendered with every cell inside of it
+            view = self.tiles.align(view)
+        first_row = max(0, view.top // row_height)
+        last_row = min(rows, (view.bottom - 1) // row_height + 1)
+        first = first_row * self.cols
+        last = min(len(self.items), last_row * self.cols)
+        return (first, max(first, last))
+
+    def update_visible_cells(self):
+        visible_range = self.get_visible_range()
+        if visible_range == self.visible_range:
+            return
+        first, last = visible_range
+
+        # every cell on screen goes back to the pool, visible items take theirs back by key
+        for index, cell in self.cells.items():
+            self.pool[cell.item_key] = cell
+        self.cells = {}
+
+        missing = []
+        for index in range(first, last):
+            cell = self.pool.pop(self.key(self.items[index]), None)
+            if cell is None:
+                missing.append(index)
+            else:
+                self.cells[index] = cell
+
+        for index in missing:
+            item = self.items[index]
+            if len(self.pool) >= self.max_pooled_cells:
+                _, cell = self.pool.popitem(last=False)
+                self.bind_cell(cell, item)
+            else:
+                cell = self.create_cell(item)
+            cell.item_key = self.key(item)
+            cell.parent = self
+            cell.set_size(self.element_size)
+            self.cells[index] = cell
+
+        for index, cell in self.cells.items():
+            row, col = divmod(index, self.cols)
+            cell.pos = (
+                col * (self.element_size[0] + self.hor_margin),
+                row * (self.element_size[1] + self.ver_margin),
+            )
+
+        while len(self.pool) > self.max_pooled_cells:
+            self.pool.popitem(last=False)
+
+        self.visible_range = visible_range
+        self.mark_dirty()
+
+    def invalidate_abs_pos(self):
+        # the visible rows depend on the position on screen
+        self.request_layout()
+        super().invalidate_abs_pos()
+
+    def layout(self):
+        self.update_visible_cells()
+
+    def scroll(self, dy):
+        if self.scrollable:
+            self.mark_dirty()
+            self.pos = (self.pos[0], self.pos[1] + dy * 50)
+            if self.scroll_limit_upper and self.pos[1] > self.scroll_limit_upper:
+                self.pos = (self.pos[0], self.scroll_limit_upper)
+            if self.scroll_limit_lower and self.pos[1] < self.scroll_limit_lower:
+                self.pos = (self.pos[0], self.scroll_limit_lower)
+            self.mark_dirty()
+        super().scroll(dy)
+
+    def step(self):
+        super().step()
+        for cell in self.cells.values():
+            cell.step()
+
+    def draw(self):
+        if self.scrollable:
+            if self.tiles is None:
+                self.use_tiles()
+                # the visible rows are aligned to the tiles from now on
+                self.visible_range = None
+                self.update_visible_cells()
+            self.tiles.draw()
+        else:
+            for cell in self.cells.values():
+                cell.draw()
+        super().draw()
+
+    def click(self):
+        for cell in list(self.cells.values()):
+            cell.click()
+
+    def no_click(self):
+        for cell in list(self.cells.values()):
+            cell.no_click()
+
+    def get_values(self):
+        values = {}
+        for cell in self.cells.values():
+            values = values | cell.get_values()
+        return values
+
+
+class TileCache:
+    """content of a scroll container rendered once into square tiles, relative to the container.
+    scrolling moves the container, the tiles stay valid and are blitted through the viewport.
+    only tiles under an element that marked itself dirty are rendered again"""
+
+    def __init__(self, element, tile_size=256, max_tiles=64):
+        self.element = element
+        self.tile_size = tile_size
+        self.tiles = LRUCache(maxsize=max_tiles)
+
+    def clear(self):
+        self.tiles.clear()
+
+    def invalidate(self, rect):
+        """drop the tiles touching rect (screen coordinates)"""
+        pos = self.element.get_abs_pos()
+        rect = pygame.Rect(rect).move(-pos[0], -pos[1])
+        for key in self.get_keys(rect):
+            self.tiles.discard(key)
+
+    def get_keys(self, rect):
+        size = self.tile_size
+        return [
+            (x, y)
+            for y in range(rect.top // size, (rect.bottom - 1) // size + 1)
+            for x in range(rect.left // size, (rect.right - 1) // size + 1)
+        ]
+
+    def align(self, rect):
+        """grow a rect relative to the container to whole tiles"""
+        size = self.tile_size
+        left = rect.left // size * size
+        top = rect.top // size * size
+        right = -(-rect.right // size) * size
+        bottom = -(-rect.bottom // size) * size
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def render(self, key):
+        size = self.tile_size
+        pos = self.element.get_abs_pos()
+        tile_rect = pygame.Rect(pos[0] + key[0] * size, pos[1] + key[1] * size, size, size)
+        surf = pygame.Surface((size, size), pygame.SRCALPHA)
+
+        win, draw_origin, window_rect = GUI.win, GUI.draw_origin, GUI.window_rect
+        GUI.window_rect = GUI.get_window_rect()
+        GUI.win = surf
+        GUI.draw_origin = tile_rect.topleft
+        self.element.draw_content(tile_rect)
+        GUI.win, GUI.draw_origin, GUI.window_rect = win, draw_origin, window_rect
+        return surf
+
+    def draw(self):
+        view = self.element.get_local_view()
+        if view.width == 0 or view.height == 0:
+            return
+        size = self.tile_size
+        pos = self.element.get_draw_pos()
+        blits = []
+        for key in self.get_keys(view):
+            tile = self.tiles.get_or_create(key, lambda: self.render(key))
+            tile_rect = pygame.Rect(key[0] * size, key[1] * size, size, size)
+            area = tile_rect.clip(view)
+            blits.append(
+                (tile, (pos[0] + area.x, pos[1] + area.y), area.move(-tile_rect.x, -tile_rect.y))
+            )
+        GUI.win.blits(blits, doreturn=False)
+
+
 class ContextMenu(StackPanel):
     """container for elements, context menu will vanish after click"""
 
@@ -597,7 +1144,18 @@ class Frame:
         self.surf = pygame.image.load(frame_dict["path"])
         self.coords = frame_dict["coords"]
 
-    def draw(self, element):
+        # how far the decoration reaches outside of the element
+        c = self.coords
+        self.margin_left = max(c[name][1][0] for name in ("top_left", "left", "bottom_left", "left_decoration"))
+        self.margin_right = max(c[name][1][0] for name in ("top_right", "right", "bottom_right", "right_decoration"))
+        self.margin_top = max(c[name][1][1] for name in ("top_left", "top", "top_right", "top_decoration"))
+        self.margin_bottom = max(c[name][1][1] for name in ("bottom_left", "bottom", "bottom_right", "bottom_decoration"))
+
+        # the complete decoration rendered once per element size
+        self.cache = LRUCache(maxsize=32)
+
+    def render(self, size):
+        """render the decoration around an element of the given size into one alpha surface"""
         top_left = self.coords["top_left"]
         top_right = self.coords["top_right"]
         bottom_right = self.coords["bottom_right"]
@@ -612,55 +1170,58 @@ class Frame:
         deco_top = self.coords["top_decoration"]
         deco_bottom = self.coords["bottom_decoration"]
 
+        # position of the element inside the rendered surface
+        pos = (self.margin_left, self.margin_top)
+
         top_left_pos = (
-            element.pos[0] - top_left[1][0],
-            element.pos[1] - top_left[1][1],
+            pos[0] - top_left[1][0],
+            pos[1] - top_left[1][1],
         )
         top_right_pos = (
-            element.pos[0] + element.size[0],
-            element.pos[1] - top_right[1][1],
+            pos[0] + size[0],
+            pos[1] - top_right[1][1],
         )
         bottom_left_pos = (
-            element.pos[0] - bottom_left[1][0],
-            element.pos[1] + element.size[1],
+            pos[0] - bottom_left[1][0],
+            pos[1] + size[1],
         )
         bottom_right_pos = (
-            element.pos[0] + element.size[0],
-            element.pos[1] + element.size[1],
+            pos[0] + size[0],
+            pos[1] + size[1],
         )
 
         left_rect = (
-            (element.pos[0] - left[1][0], element.pos[1]),
-            (left[1][0], element.size[1]),
+            (pos[0] - left[1][0], pos[1]),
+            (left[1][0], size[1]),
         )
         right_rect = (
-            (element.pos[0] + element.size[0], element.pos[1]),
-            (right[1][0], element.size[1]),
+            (pos[0] + size[0], pos[1]),
+            (right[1][0], size[1]),
         )
         top_rect = (
-            (element.pos[0], element.pos[1] - top[1][1]),
-            (element.size[0], top[1][1]),
+            (pos[0], pos[1] - top[1][1]),
+            (size[0], top[1][1]),
         )
         bottom_rect = (
-            (element.pos[0], element.pos[1] + element.size[1]),
-            (element.size[0], bottom[1][1]),
+            (pos[0], pos[1] + size[1]),
+            (size[0], bottom[1][1]),
         )
 
         deco_left_pos = (
-            element.pos[0] - deco_left[1][0],
-            element.pos[1] + element.size[1] // 2 - deco_left[1][1] // 2,
+            pos[0] - deco_left[1][0],
+            pos[1] + size[1] // 2 - deco_left[1][1] // 2,
         )
         deco_right_pos = (
-            element.pos[0] + element.size[0],
-            element.pos[1] + element.size[1] // 2 - deco_left[1][1] // 2,
+            pos[0] + size[0],
+            pos[1] + size[1] // 2 - deco_left[1][1] // 2,
         )
         deco_top_pos = (
-            element.pos[0] + element.size[0] // 2 - deco_top[1][0] // 2,
-            element.pos[1] - deco_top[1][1],
+            pos[0] + size[0] // 2 - deco_top[1][0] // 2,
+            pos[1] - deco_top[1][1],
         )
         deco_bottom_pos = (
-            element.pos[0] + element.size[0] // 2 - deco_bottom[1][0] // 2,
-            element.pos[1] + element.size[1],
+            pos[0] + size[0] // 2 - deco_bottom[1][0] // 2,
+            pos[1] + size[1],
         )
 
         left_surf = pygame.Surface(left[1], pygame.SRCALPHA)
@@ -679,50 +1240,67 @@ class Frame:
         bottom_surf.blit(self.surf, (0, 0), bottom)
         bottom_surf = pygame.transform.scale(bottom_surf, bottom_rect[1])
 
-        win = GUI.win
+        surf = pygame.Surface(
+            (
+                self.margin_left + size[0] + self.margin_right,
+                self.margin_top + size[1] + self.margin_bottom,
+            ),
+            pygame.SRCALPHA,
+        )
 
-        win.blit(self.surf, top_left_pos, top_left)
-        win.blit(self.surf, top_right_pos, top_right)
-        win.blit(self.surf, bottom_left_pos, bottom_left)
-        win.blit(self.surf, bottom_right_pos, bottom_right)
+        surf.blit(self.surf, top_left_pos, top_left)
+        surf.blit(self.surf, top_right_pos, top_right)
+        surf.blit(self.surf, bottom_left_pos, bottom_left)
+        surf.blit(self.surf, bottom_right_pos, bottom_right)
 
-        win.blit(left_surf, left_rect[0])
-        win.blit(right_surf, right_rect[0])
-        win.blit(top_surf, top_rect[0])
-        win.blit(bottom_surf, bottom_rect[0])
+        surf.blit(left_surf, left_rect[0])
+        surf.blit(right_surf, right_rect[0])
+        surf.blit(top_surf, top_rect[0])
+        surf.blit(bottom_surf, bottom_rect[0])
 
-        win.blit(self.surf, deco_left_pos, deco_left)
-        win.blit(self.surf, deco_right_pos, deco_right)
-        win.blit(self.surf, deco_top_pos, deco_top)
-        win.blit(self.surf, deco_bottom_pos, deco_bottom)
+        surf.blit(self.surf, deco_left_pos, deco_left)
+        surf.blit(self.surf, deco_right_pos, deco_right)
+        surf.blit(self.surf, deco_top_pos, deco_top)
+        surf.blit(self.surf, deco_bottom_pos, deco_bottom)
+
+        return surf
+
+    def draw(self, element):
+        size = (int(element.size[0]), int(element.size[1]))
+        surf = self.cache.get_or_create(size, lambda: self.render(size))
+        element_pos = element.get_draw_pos()
+        pos = (element_pos[0] - self.margin_left, element_pos[1] - self.margin_top)
+        GUI.win.blit(surf, pos)
 
         if GUI.debug:
-            pygame.draw.rect(GUI.win, (255, 255, 255), (top_left_pos, top_left[1]), 1)
-            pygame.draw.rect(GUI.win, (255, 255, 255), (top_right_pos, top_right[1]), 1)
-            pygame.draw.rect(
-                GUI.win, (255, 255, 255), (bottom_left_pos, bottom_left[1]), 1
-            )
-            pygame.draw.rect(
-                GUI.win, (255, 255, 255), (bottom_right_pos, bottom_right[1]), 1
-            )
+            pygame.draw.rect(GUI.win, (255, 255, 255), (pos, surf.get_size()), 1)
 
 
 class Picture(Element):
-    """present surface"""
+    """present surface, or only the area of it (e.g. a thumbnail inside an atlas page)"""
 
-    def __init__(self, surf):
+    def __init__(self, surf, area=None):
         super().__init__()
         self.surf = surf
-        self.size = self.surf.get_size()
+        self.area = area
+        self.size = tuple(area[1]) if area else self.surf.get_size()
+        self.surf_width = self.size[0]
+
+    def set_surf(self, surf, area=None):
+        """swap the presented surface, keeping the layout size"""
+        self.surf = surf
+        self.area = area
+        self.surf_width = area[1][0] if area else surf.get_width()
+        self.mark_dirty()
 
     def draw(self):
-        pos = self.get_abs_pos()
+        pos = self.get_draw_pos()
         size = self.size
         if self.use_parents_size:
             size = self.parent.size
         super().draw()
         GUI.win.blit(
-            self.surf, (pos[0] + size[0] // 2 - self.surf.get_width() // 2, pos[1])
+            self.surf, (pos[0] + size[0] // 2 - self.surf_width // 2, pos[1]), self.area
         )
 
 
@@ -771,21 +1349,11 @@ class CheckBox(Element):
         self.size = self.surf.get_size()
         self.event = {"key": self.key, "element": self, 'state': self.checked}
 
-    def step(self):
-        super().step()
-        mouse_pos = pygame.mouse.get_pos()
-        # if mouse on me
-        pos = self.get_abs_pos()
-        if (
-            mouse_pos[0] > pos[0]
-            and mouse_pos[0] < pos[0] + self.size[0]
-            and mouse_pos[1] > pos[1]
-            and mouse_pos[1] < pos[1] + self.size[1]
-        ):
-            GUI.focused_element = self
+    def collect_hit_targets(self, targets):
+        targets.append((pygame.Rect(self.get_abs_pos(), self.size), self))
 
     def draw(self):
-        pos = self.get_abs_pos()
+        pos = self.get_draw_pos()
         surf = self.surf if not self.checked else self.surf_checked
 
         GUI.win.blit(surf, pos)
@@ -793,6 +1361,7 @@ class CheckBox(Element):
     def click(self):
         self.checked = not self.checked
         self.event['state'] = self.checked
+        self.mark_dirty()
         GUI.gui_event_handler(self.event)
 
     def get_values(self):    
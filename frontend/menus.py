@@ -9,12 +9,17 @@ class MenuManager:
         self.current_menu = None
         self.map_menu = None
         self.config = config
+        self.atlas = None
 
 
     def set_config(self, config):
         self.config = config
 
 
+    def set_atlas(self, atlas):
+        self.atlas = atlas
+
+
     def create_loading_screen(self, win):
         cm = StackPanel()
         label_title = Label("LOADING...", GUI.get_font_at(1))
@@ -58,40 +63,59 @@ class MenuManager:
 
         GUI.append(self.current_menu)
 
-    def create_columns_maps(self, found_maps) -> Columns:
+    def get_map_thumbnail(self, map_obj):
+        """(surface, area) of the map thumbnail, from the atlas page if it was packed"""
+        region = self.atlas.get('maps', map_obj.name) if self.atlas else None
+        if region:
+            return region
+        return map_obj.thumbnail, None
+
+    def create_map_card(self, map):
+        map_obj = self.config.get_map(map)
+        # inside columns: create stackpanel per map
+        thumbnail_stackpanel = StackPanel()
+        # inside stackpanel: elements
+        elements = Elements()
+        picture = Picture(*self.get_map_thumbnail(map_obj))
+        picture.use_parents_size = True
+        elements.append(picture)
+        favorite_button = CheckBoxStar('favorited')
+        favorite_button.event["map_name"] = map
+        if map_obj.favorite:
+            favorite_button.checked = True
+        elements.append(favorite_button)
+
+        elements.set_size(elements.elements[0].size)
+        thumbnail_stackpanel.append(elements)
+        button = Button(
+            map,
+            "change_map",
+            GUI.get_font_at(2),
+            custom_width=400,
+        )
+        thumbnail_stackpanel.linked_button = button
+        thumbnail_stackpanel.append(button)
+        return thumbnail_stackpanel
+
+    def bind_map_card(self, thumbnail_stackpanel, map):
+        """reuse a card created by create_map_card for another map"""
+        map_obj = self.config.get_map(map)
+        elements, button = thumbnail_stackpanel.elements
+        picture, favorite_button = elements.elements
+        picture.set_surf(*self.get_map_thumbnail(map_obj))
+        favorite_button.checked = map_obj.favorite
+        favorite_button.event["map_name"] = map
+        favorite_button.event["state"] = map_obj.favorite
+        button.set_text(map)
+
+    def create_columns_maps(self, found_maps) -> VirtualColumns:
         """create columns based on found map and return columns object"""
 
-        # create columns
-        thumbnail_columns = Columns(cols=3)
-        for map in found_maps:
-            map_obj = self.config.get_map(map)
-            thumbnail = map_obj.thumbnail
-            # inside columns: create stackpanel per map
-            thumbnail_stackpanel = StackPanel()
-            # inside stackpanel: elements
-            elements = Elements()
-            picture = Picture(thumbnail)
-            picture.use_parents_size = True
-            elements.append(picture)
-            favorite_button = CheckBoxStar('favorited')
-            favorite_button.event["map_name"] = map
-            if map_obj.favorite:
-                favorite_button.checked = True
-            elements.append(favorite_button)
-
-            elements.set_size(elements.elements[0].size)
-            thumbnail_stackpanel.append(elements)
-            button = Button(
-                map,
-                "change_map",
-                GUI.get_font_at(2),
-                custom_width=400,
-            )
-            thumbnail_stackpanel.linked_button = button
-            thumbnail_stackpanel.append(button)
-            thumbnail_columns.append(thumbnail_stackpanel)
-            thumbnail_columns.scrollable = True
-            thumbnail_columns.scroll_limit_upper = 200
+        # create columns, cards are created only for the rows on screen
+        thumbnail_columns = VirtualColumns(3, self.create_map_card, self.bind_map_card)
+        thumbnail_columns.scrollable = True
+        thumbnail_columns.scroll_limit_upper = 200
+        thumbnail_columns.set_items(found_maps)
         return thumbnail_columns
 
     def create_menu_maps(self, maps: list[str]):
@@ -114,6 +138,11 @@ class MenuManager:
         thumbnail_columns.set_pos(
             (GUI.win.get_width() // 2 - thumbnail_columns.size[0] // 2, 200)
         )
+        # the cards scroll under the search box
+        viewport_top = search_textbox.pos[1] + search_textbox.size[1]
+        thumbnail_columns.viewport = pygame.Rect(
+            0, viewport_top, GUI.win.get_width(), GUI.win.get_height() - viewport_top
+        )
 
         self.current_menu.append(thumbnail_columns)
         self.current_menu.append(search_textbox)
@@ -232,29 +261,13 @@ class MenuManager:
         if self.current_menu and self.current_menu in GUI.elements:
             GUI.remove(self.current_menu)
 
-        # create columns
-        token_columns = Columns(cols=3)
-
-        for token in available_tokens:
-            thumbnail = token['thumbnail']
-            # inside columns: create stackpanel per map
-            thumbnail_stackpanel = StackPanel()
-            # inside stackpanel: elements
-            picture = Picture(thumbnail)
-            picture.use_parents_size = True
-            thumbnail_stackpanel.append(picture)
-            button = Button(
-                token['name'],
-                "insert_token",
-                GUI.get_font_at(2),
-                custom_width=400,
-            )
-            button.event['token'] = token
-            thumbnail_stackpanel.linked_button = button
-            thumbnail_stackpanel.append(button)
-            token_columns.append(thumbnail_stackpanel)
-            token_columns.scrollable = True
-            token_columns.scroll_limit_upper = 200
+        # create columns, cards are created only for the rows on screen
+        token_columns = VirtualColumns(
+            3, self.create_token_card, self.bind_token_card, key=lambda token: token['path']
+        )
+        token_columns.scrollable = True
+        token_columns.scroll_limit_upper = 200
+        token_columns.set_items(available_tokens)
 
         token_columns.set_pos(
             (
@@ -264,4 +277,30 @@ class MenuManager:
         )
         self.current_menu = token_columns
         GUI.append(token_columns)
-        
\ No newline at end of file
+
+    def create_token_card(self, token):
+        # inside columns: create stackpanel per token
+        thumbnail_stackpanel = StackPanel()
+        # inside stackpanel: elements
+        picture = Picture(token['thumbnail'], token['thumbnail_area'])
+        picture.use_parents_size = True
+        # thumbnails fit in a 300x300 box, keep all the cards the same height
+        picture.set_size((picture.size[0], 300))
+        thumbnail_stackpanel.append(picture)
+        button = Button(
+            token['name'],
+            "insert_token",
+            GUI.get_font_at(2),
+            custom_width=400,
+        )
+        button.event['token'] = token
+        thumbnail_stackpanel.linked_button = button
+        thumbnail_stackpanel.append(button)
+        return thumbnail_stackpanel
+
+    def bind_token_card(self, thumbnail_stackpanel, token):
+        """reuse a card created by create_token_card for another token"""
+        picture, button = thumbnail_stackpanel.elements
+        picture.set_surf(token['thumbnail'], token['thumbnail_area'])
+        button.set_text(token['name'])
+        button.event['token'] = token
@@ -3,6 +3,14 @@
 import pygame
 import os
 from backend.settings import Controls
+from tools.tracing import traced
+
+
+def fit_thumbnail(surf: pygame.Surface, box=300) -> pygame.Surface:
+    """scale surf to fit in a box x box square"""
+    size = max(surf.get_width(), surf.get_height())
+    factor = box / size
+    return pygame.transform.smoothscale_by(surf, factor)
 
 
 class TokenManager:
@@ -20,22 +28,26 @@ class TokenManager:
 
         self.available_tokens = []
 
-    def load_tokens(self, path: str):
+    @traced("TokenManager.load_tokens", "tokens")
+    def load_tokens(self, path: str, atlas=None):
         tokens_dir = path
         for root, _, files in os.walk(tokens_dir):
             for file in files:
                 if not file.endswith('.png'):
                     continue
                 path = os.path.join(root, file)
-                thumbnail = pygame.image.load(path)
-                # fit in 300x300 box
-                size = max(thumbnail.get_width(), thumbnail.get_height())
-                factor = 300 / size
-                thumbnail = pygame.transform.smoothscale_by(thumbnail, factor)
+                name = os.path.basename(file)
+                region = atlas.get('tokens', name) if atlas else None
+                if region:
+                    thumbnail, thumbnail_area = region
+                else:
+                    thumbnail = fit_thumbnail(pygame.image.load(path))
+                    thumbnail_area = None
                 token = {
                     'path': path,
-                    'name': os.path.basename(file),
-                    'thumbnail': thumbnail
+                    'name': name,
+                    'thumbnail': thumbnail,
+                    'thumbnail_area': thumbnail_area,
                     }
                 self.available_tokens.append(token)
 
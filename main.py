@@ -11,24 +11,45 @@
 __version__ = "1.0.0"
 
 from typing import Tuple
+import sys
+import os
+import time
+import argparse
+import json
+import random
 from math import cos, sin, pi, atan2, degrees, sqrt
+from tools.startup import startup
+
+# the imports below are timed too, so the flag is checked before argparse runs
+if "--startup-report" in sys.argv:
+    startup.enable()
+
 from tools.utils import cycle
+from tools.profilers import FrameProfiler
+from tools.tracing import tracer, span
+from tools.recorder import InputRecorder, InputReplayer
+from tools.pacing import FramePacer
 import pygame as pg
 from collections import deque
 from enum import Enum
 from frontend.gui import *
 from frontend.font import Font
+from frontend.atlas import Atlas
 from backend.factories import AbstractFactory, SimpleFactory
+from backend.searchers.worker import SearchWorker, SearchResult
 from frontend.effects import Effects, DarknessEffect, ColorFilter
 from frontend.tokens import TokenManager, TokenSurf
 from frontend.menus import MenuManager
 
+startup.mark("imports")
+
 FPS = 60
 
 
 class Event(Enum):
     PLAY = 0
     CHANGE_MAP = 1
+    SEARCH_RESULTS = 2
 
 
 class State(Enum):
@@ -57,22 +78,33 @@ class GameEvent:
 class GameManager:
     _instance = None
 
-    def __init__(self, factory: AbstractFactory):
+    def __init__(self, factory: AbstractFactory, deterministic: bool = False):
         GameManager._instance = self
+        self.factory = factory
         self.menu_manager = MenuManager()
         self.settings = factory.create_settings("settings.json")
+        startup.mark("settings")
 
         # Setting up GUI fonts
         self.__setup_gui_fonts()
 
         # Creating GUI frame
         self.__setup_gui_frame()
+        startup.mark("gui fonts and frame")
 
         self.draw_custom_cursor = False
+        # 0 runs unthrottled (benchmarks)
+        self.max_fps = FPS
 
         # Create the screen
         self.screen = None
         self.__setup_screen()
+        startup.mark("screen")
+
+        # Loading the thumbnails atlas (after the screen, for convert_alpha)
+        self.thumbnail_atlas = None
+        self.__setup_thumbnail_atlas()
+        startup.mark("thumbnail atlas")
 
         # Create the clock
         self.clock = pg.time.Clock()
@@ -80,21 +112,33 @@ class GameManager:
         self.menu_manager.create_loading_screen(self.screen)
         maps_config_path = self.settings.get("maps_config", default="maps.json")
         tokens_dir = self.settings.get("tokens_path", default="assets/tokens")
+        self.tokens_dir = tokens_dir
         self.config = factory.create_config(maps_config_path)
+        startup.mark("maps config")
         self.loader = factory.create_loader(self.config)
-        self.map_searcher = factory.create_searcher(self.config)
+        # search.fast ranks with the trigram vectors, faster on large catalogs but an edit of
+        # the maps rebuilds them (see tools/searchBenchmark.py)
+        self.map_searcher = factory.create_searcher(
+            self.config, fast=self.settings.get("search", subname="fast", default=False)
+        )
+        startup.mark("map searcher")
         self.controls = factory.create_controls(self.settings)
-        self.tokens_manager = factory.create_tokens_manager(tokens_dir)
-        self.token_searcher = factory.create_token_searcher(self.tokens_manager)
-        self.db_searcher = factory.create_db_searcher()
+        # created on first use, see the properties below
+        self.__tokens_manager = None
+        self.__token_searcher = None
+        self.__db_searcher = None
         self.maps = self.config.maps_names
         self.menu_manager.set_config(self.config)
 
         # update screen
-        self.screen.blit(get_background(), (0, 0))
+        self.background = get_background(
+            self.settings.get("background", default="assets/images/background.png")
+        )
+        self.screen.blit(self.background, (0, 0))
         GUI.step()
         GUI.draw()
         pg.display.flip()
+        startup.mark("loading screen")
 
         self.current_map_name = None
         self.current_map_frames = None
@@ -110,12 +154,23 @@ class GameManager:
         self.state = State.GAME_MAIN_MENU
         self.event_que = deque()
 
+        # maps are searched in the background while typing, the results come back as game events.
+        # deterministic (recording or replaying) searches inline, a result must arrive on the
+        # same frame in every run
+        self.search_worker = SearchWorker(
+            self.map_searcher,
+            lambda result: self.add_event(GameEvent(Event.SEARCH_RESULTS, result)),
+            debounce=self.settings.get("search", subname="debounce", default=0.15),
+            inline=deterministic,
+        )
+
         self.effects = Effects()
         self.tokens = TokenManager(
             self.screen,
             self.controls,
         )
-        self.tokens.load_tokens(r"./assets/tokens")
+        self.tokens.load_tokens(tokens_dir, self.thumbnail_atlas)
+        startup.mark("tokens")
 
         self.map_zoom = 1.0
         self.map_offset = (0, 0)
@@ -125,6 +180,46 @@ class GameManager:
         self.cursor_length = 50
         self.cursor_edge = (0, 0)
 
+        # per-stage frame timing, shown and dumped with the profiler controls
+        self.profiler = FrameProfiler(tracer=tracer)
+        self.profiler_hud_pos = (10, 10)
+
+        # input of the session is recorded to / replayed from a file (--record / --replay)
+        self.recorder = None
+        self.replayer = None
+
+        # frame rate follows what is on screen, see FramePacer
+        self.pacer = FramePacer(
+            idle_fps=self.settings.get("frame_pacing", subname="idle_fps", default=10),
+            unfocused_fps=self.settings.get(
+                "frame_pacing", subname="unfocused_fps", default=15
+            ),
+            idle_after=self.settings.get("frame_pacing", subname="idle_after", default=2.0),
+        )
+
+    @property
+    def tokens_manager(self):
+        # loads and cleans up every token image, only the tokens search needs it
+        if self.__tokens_manager is None:
+            with span("create tokens manager", "startup"):
+                self.__tokens_manager = self.factory.create_tokens_manager(self.tokens_dir)
+        return self.__tokens_manager
+
+    @property
+    def token_searcher(self):
+        if self.__token_searcher is None:
+            with span("create token searcher", "startup"):
+                self.__token_searcher = self.factory.create_token_searcher(self.tokens_manager)
+        return self.__token_searcher
+
+    @property
+    def db_searcher(self):
+        # connects to the database, nothing on the table needs it before it is searched
+        if self.__db_searcher is None:
+            with span("create db searcher", "startup"):
+                self.__db_searcher = self.factory.create_db_searcher()
+        return self.__db_searcher
+
     def __setup_screen(self) -> None:
         # Create the screen
         resolution_width = self.settings.get(
@@ -153,6 +248,14 @@ class GameManager:
         frame = self.settings.get("frame", default="assets/images/frame.json")
         GUI.frames.append(Frame(frame))
 
+    def __setup_thumbnail_atlas(self) -> None:
+        # Loading the thumbnails atlas built by tools/atlasBuilder.py, if there is one
+        atlas = self.settings.get("thumbnail_atlas", default="assets/thumbnails/atlas.json")
+        if not os.path.exists(atlas):
+            return
+        self.thumbnail_atlas = Atlas(atlas)
+        self.menu_manager.set_atlas(self.thumbnail_atlas)
+
     def __setup_grid(self) -> None:
         # Setting up the grid
         self.grid_size = self.settings.get("grid", subname="size", default=60)
@@ -179,12 +282,29 @@ class GameManager:
         while len(self.event_que):
             event = self.event_que.popleft()
             if event.type == Event.CHANGE_MAP:
+                tracer.instant("change map", "loader", map=event.data)
                 self.current_map_name = event.data
                 self.current_map_frames = self.loader.load_map(self.current_map_name)
                 print(self.current_map_name)
                 self.state = State.GAME_RUM_MAP
             elif event.type == Event.PLAY:
                 self.state = State.GAME_RUM_MAP
+            elif event.type == Event.SEARCH_RESULTS:
+                self.show_search_results(event.data)
+
+    def show_search_results(self, result: SearchResult):
+        if not self.search_worker.is_current(result.generation):
+            # the user kept typing, a newer search is on its way
+            return
+        self.maps = result.matches
+        if self.menu_manager.map_menu is None:
+            return
+        # the cards of maps already seen are reused, only new maps get rendered
+        thumbnail_columns = self.menu_manager.map_menu.elements[0]
+        thumbnail_columns.set_items(result.matches)
+        thumbnail_columns.set_pos(
+            (GUI.win.get_width() // 2 - thumbnail_columns.size[0] // 2, 200)
+        )
 
     def global_pygame_event_handler(self, event):
         if event.type == pg.QUIT:
@@ -203,6 +323,18 @@ class GameManager:
                 pygame.display.set_mode(self.screen.get_size(), pygame.FULLSCREEN)
             elif event.key == pg.K_t:
                 self.test()
+            elif event.key == self.controls.get("toggle_profiler"):
+                hud_rect = self.profiler.get_hud_rect(self.profiler_hud_pos)
+                if hud_rect:
+                    # uncover what is under the hud in retained mode
+                    GUI.invalidate(hud_rect)
+                self.profiler.toggle_hud()
+            elif event.key == self.controls.get("dump_profiler"):
+                path = time.strftime("frame_profile_%Y%m%d_%H%M%S.csv")
+                self.profiler.dump_csv(path)
+                print(f"frame profile saved to {path}")
+            elif event.key == self.controls.get("export_trace"):
+                self.export_trace()
         elif event.type == pg.MOUSEMOTION:
             dir_to_cursor_edge = (
                 self.cursor_edge[0] - event.pos[0],
@@ -219,8 +351,62 @@ class GameManager:
     def test(self):
         pass
 
+    def export_trace(self):
+        if not tracer.enabled:
+            print("tracing is off, run with --trace")
+            return
+        path = time.strftime("trace_%Y%m%d_%H%M%S.json")
+        tracer.export(path)
+        print(f"trace saved to {path}")
+
+    def shutdown(self):
+        self.search_worker.stop()
+        if tracer.enabled:
+            self.export_trace()
+        if self.recorder:
+            self.recorder.save()
+            print(f"input recorded to {self.recorder.path}")
+        if self.replayer:
+            print(json.dumps(self.replayer.report(self.profiler), indent=2))
+
+    def get_events(self):
+        """the pygame events of this frame, from the replayed recording if there is one"""
+        if self.replayer:
+            events = self.replayer.next_events()
+        else:
+            # events that woke an idle frame come first
+            events = self.pacer.take_stashed_events() + pg.event.get()
+            self.pacer.notify(events)
+        if self.recorder:
+            self.recorder.record_frame(events)
+        return events
+
+    def wait_next_frame(self, active_fps, animating=False):
+        if self.max_fps == 0:
+            # unthrottled, no pacing
+            self.clock.tick(0)
+            return
+        fps = self.pacer.get_fps(min(active_fps, self.max_fps), animating)
+        self.pacer.wait(self.clock, fps)
+
+    def get_map_fps(self):
+        map_obj = self.config.get_map(self.current_map_name)
+        if map_obj.num_frames is not None and map_obj.num_frames <= 1:
+            # a still image, nothing to animate
+            return None
+        if not map_obj.fps:
+            return self.max_fps
+        return map_obj.fps
+
     def step(self):
-        self.handle_game_events()
+        if self.pacer.minimized and self.max_fps != 0:
+            # nothing to show, sleep until the window comes back. other events (e.g. closing
+            # the window from the taskbar) are handled by a frame right away
+            if not self.pacer.wait_minimized():
+                return
+
+        with span("game events"):
+            self.handle_game_events()
 
         if self.state == State.GAME_MAIN_MENU:
             self.main_menu()
@@ -231,21 +417,46 @@ class GameManager:
         self.menu_manager.create_main_menu(self.screen)
 
     def main_menu(self):
-        background = get_background()
-
-        for event in pg.event.get():
+        profiler = self.profiler
+        profiler.begin_frame()
+        for event in self.get_events():
             GUI.event_handle(event)
             self.global_pygame_event_handler(event)
+        profiler.mark("events")
 
         GUI.step()
+        profiler.mark("gui step")
 
-        self.screen.blit(background, (0, 0))
-        GUI.draw()
+        # the menu is busy while the gui changes or animates (a blinking cursor)
+        if GUI.dirty_rects or GUI.animated:
+            self.pacer.activity()
+
+        if self.draw_custom_cursor:
+            # the cursor moves over the whole screen, present all of it
+            GUI.invalidate()
+        hud_rect = profiler.get_hud_rect(self.profiler_hud_pos)
+        if profiler.show_hud and hud_rect:
+            # the hud is redrawn every frame on top of the gui
+            GUI.invalidate(hud_rect)
+
+        # retained mode: present only what changed since the last frame
+        dirty_rects = GUI.render_overlay()
+        profiler.mark("gui render")
+        for rect in dirty_rects:
+            self.screen.blit(self.background, rect, rect)
+            self.screen.blit(GUI.overlay, rect, rect)
+        profiler.mark("present")
 
         self.draw_cursor()
+        self.draw_profiler_hud()
+        profiler.mark("cursor & hud")
         # update the display and tick the clock
-        pg.display.flip()
-        self.clock.tick(FPS)
+        if dirty_rects:
+            pg.display.update(dirty_rects)
+        profiler.mark("flip")
+        self.wait_next_frame(self.max_fps, bool(GUI.animated))
+        profiler.mark("tick wait")
+        profiler.end_frame()
 
     def apply_color_filter(self, color, name, apply):
         if not apply:
@@ -278,8 +489,16 @@ class GameManager:
             ),
         )
 
+    def draw_profiler_hud(self):
+        if not self.profiler.show_hud:
+            return
+        hud = self.profiler.render_hud(GUI.get_font_at(2), GUI.default_text_color)
+        self.screen.blit(hud, self.profiler_hud_pos)
+
     def run_map(self):
-        for event in pg.event.get():
+        profiler = self.profiler
+        profiler.begin_frame()
+        for event in self.get_events():
             GUI.event_handle(event)
             self.global_pygame_event_handler(event)
             self.tokens.handle_pygame_events(event)
@@ -352,6 +571,7 @@ class GameManager:
                     map_index = self.maps.index(self.current_map_name)
                     next_map_index = (map_index + 1) % len(self.maps)
                     self.current_map_name = self.maps[next_map_index]
+                    tracer.instant("change map", "loader", map=self.current_map_name)
                     self.current_map_frames = self.loader.load_map(
                         self.current_map_name
                     )
@@ -359,6 +579,7 @@ class GameManager:
                     map_index = self.maps.index(self.current_map_name)
                     next_map_index = (map_index - 1) % len(self.maps)
                     self.current_map_name = self.maps[next_map_index]
+                    tracer.instant("change map", "loader", map=self.current_map_name)
                     self.current_map_frames = self.loader.load_map(
                         self.current_map_name
                     )
@@ -376,27 +597,47 @@ class GameManager:
                     token.pos = pygame.mouse.get_pos()
                     self.tokens.append(token)
 
+        profiler.mark("events")
+
         GUI.step()
+        profiler.mark("gui step")
         self.tokens.step()
+        profiler.mark("tokens step")
         self.effects.step()
+        profiler.mark("effects step")
 
         # draw the frame,
         frame = next(self.current_map_frames)
+        profiler.mark("decode")
         if self.map_zoom > 1.0:
             frame = pygame.transform.smoothscale_by(frame, self.map_zoom)
+            profiler.mark("zoom")
 
         self.screen.blit(frame, self.map_offset)
+        profiler.mark("map blit")
 
         self.draw_grid()
+        profiler.mark("grid")
         self.tokens.draw()
+        profiler.mark("tokens draw")
         self.effects.draw()
+        profiler.mark("effects draw")
 
         GUI.draw()
+        profiler.mark("gui draw")
 
         self.draw_cursor()
+        self.draw_profiler_hud()
+        profiler.mark("cursor & hud")
         # update the display and tick the clock
         pg.display.flip()
-        self.clock.tick(FPS)
+        profiler.mark("flip")
+        # a map video plays at its own frame rate
+        map_fps = self.get_map_fps()
+        animating = map_fps is not None or self.effects.animated
+        self.wait_next_frame(map_fps or self.max_fps, animating)
+        profiler.mark("tick wait")
+        profiler.end_frame()
 
 
 def draw_grid(surf, size=50, color=GridColors.BLACK.value):
@@ -434,15 +675,8 @@ def handle_gui_events(event: str):
         GUI.elements.remove(menu_manager.current_menu)
         menu_manager.current_menu = None
     elif event["key"] == "search":
-        found_maps = game_manager.map_searcher.search(event["text"])
-        game_manager.maps = found_maps
-        thumbnail_columns = menu_manager.current_menu.elements[0]
-        menu_manager.current_menu.elements.remove(thumbnail_columns)
-        thumbnail_columns = game_manager.menu_manager.create_columns_maps(found_maps)
-        menu_manager.current_menu.elements.insert(0, thumbnail_columns)
-        thumbnail_columns.set_pos(
-            (GUI.win.get_width() // 2 - thumbnail_columns.size[0] // 2, 200)
-        )
+        # searched on the worker thread, enter skips the debounce
+        game_manager.search_worker.submit(event["text"], immediate=event["state"] == "done")
     elif event["key"] == "map_menu":
         game_manager.menu_manager.create_menu_maps(game_manager.maps)
     elif event["key"] == "start":
@@ -513,24 +747,67 @@ def handle_gui_events(event: str):
         menu_manager.current_menu = None
 
 
-def get_background():
-    image_path = r"assets/images/background.png"
+def get_background(image_path=r"assets/images/background.png"):
     image = pg.image.load(image_path)
     return image
 
 
 def main():
+    parser = argparse.ArgumentParser(description="DND virtual table top")
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="record a trace of the game, saved on exit or with the export_trace control",
+    )
+    parser.add_argument("--record", type=str, help="record the input of the session to a file")
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="replay a recorded session headless, as fast as possible, and print its timings",
+    )
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print the time to the first frame, by import and by initialization step",
+    )
+    args = parser.parse_args()
+    if args.trace:
+        tracer.enable()
+    if args.record or args.replay:
+        # effects use random, a replay has to see the same numbers
+        random.seed(0)
+    if args.replay:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
     pg.init()
 
     GUI.gui_event_handler = handle_gui_events
     GUI.initialize("./assets/images/gui_config.json")
-
-    game_manager = GameManager(factory=SimpleFactory)
-
-    game_manager.setup()
-
-    while True:
-        game_manager.step()
+    startup.mark("pygame and gui")
+
+    game_manager = GameManager(
+        factory=SimpleFactory, deterministic=bool(args.record or args.replay)
+    )
+    if args.record:
+        game_manager.recorder = InputRecorder(args.record)
+    if args.replay:
+        replayer = InputReplayer(args.replay)
+        replayer.install()
+        game_manager.replayer = replayer
+        game_manager.max_fps = 0
+        game_manager.profiler = FrameProfiler(history=max(1, len(replayer)), tracer=tracer)
+
+    try:
+        game_manager.setup()
+
+        while not (game_manager.replayer and game_manager.replayer.finished):
+            game_manager.step()
+            if startup.enabled and not startup.finished:
+                budget = game_manager.settings.get("startup", subname="budget", default=None)
+                print(json.dumps(startup.finish(budget), indent=2))
+    finally:
+        game_manager.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# the game loads its assets relative to the repository, without a display in tests
+ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
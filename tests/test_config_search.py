@@ -0,0 +1,109 @@
+import json
+import threading
+import pytest
+
+pytest.importorskip("pygame")
+pytest.importorskip("numpy")
+
+from backend.config import Config
+from backend.searchers.searchers import MapSearcher
+from backend.searchers.strategies import ScoredMapSearchingStrategy
+
+WORDS = ["forest", "cave", "dark", "river", "castle", "night", "swamp", "tavern"]
+
+
+@pytest.fixture
+def config(tmp_path):
+    maps = [
+        {
+            "name": f"{WORDS[i % 8]} {WORDS[(i * 3 + 1) % 8]} {i}",
+            "path": f"assets/maps/test_{i}.mp4",
+            "tags": [WORDS[i % 8], WORDS[(i * 5 + 2) % 8]],
+            "thumbnail": f"assets/thumbnails/test_{i}.jpg",
+            "url": "",
+            "favorite": i % 7 == 0,
+        }
+        for i in range(200)
+    ]
+    path = tmp_path.joinpath("maps.json")
+    path.write_text(json.dumps(maps))
+    return Config(str(path))
+
+
+def test_search_waits_for_the_change_to_be_published(config):
+    searcher = MapSearcher(ScoredMapSearchingStrategy(config), config)
+    blocked = []
+
+    def on_change(event):
+        # the config is changed but the searcher has not seen it yet
+        search = threading.Thread(target=searcher.search, args=("forest",))
+        search.start()
+        search.join(0.1)
+        blocked.append(search.is_alive())
+
+    config.subscribe(on_change)
+    config.add_tags(config.maps_names[0], "haunted")
+    assert blocked == [True]
+
+
+def test_change_does_not_wait_for_a_search(config):
+    searching = threading.Event()
+    resume = threading.Event()
+
+    class SlowStrategy(ScoredMapSearchingStrategy):
+        def search(self, query, n=-1):
+            searching.set()
+            resume.wait(5)
+            return super().search(query, n)
+
+    searcher = MapSearcher(SlowStrategy(config), config)
+    results = []
+    search = threading.Thread(target=lambda: results.append(searcher.search("tag:haunted")))
+    search.start()
+    assert searching.wait(5)
+
+    # the search is still running, the edit goes through
+    done = threading.Event()
+    edit = threading.Thread(target=lambda: (config.add_tags(config.maps_names[0], "haunted"), done.set()))
+    edit.start()
+    assert done.wait(1)
+    resume.set()
+    search.join(5)
+    edit.join()
+
+    # the search started before the edit but is published after it, it is searched again
+    assert results == [[config.maps_names[0]]]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_search_while_the_config_changes(config, fast):
+    searcher = MapSearcher(ScoredMapSearchingStrategy(config, fast=fast), config)
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        queries = ["forest", "dark cave", "haunted", "forest -night", "castel", ""]
+        while not stop.is_set():
+            for query in queries:
+                try:
+                    searcher.search(query)
+                except Exception as e:
+                    errors.append(e)
+
+    worker = threading.Thread(target=search)
+    worker.start()
+    try:
+        for i in range(50):
+            name = config.maps_names[i]
+            config.add_tags(name, "haunted")
+            config.set_favorite(name, True)
+            config.rename_map(name, f"haunted place {i}")
+            config.remove_tags(f"haunted place {i}", "haunted")
+    finally:
+        stop.set()
+        worker.join()
+
+    assert errors == []
+    fresh = ScoredMapSearchingStrategy(config, fast=fast)
+    for query in ["forest", "haunted place", "dark cave", "tag:haunted"]:
+        assert searcher.search(query) == fresh.search(query)
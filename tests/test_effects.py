@@ -0,0 +1,38 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from frontend.effects import Effects, ColorFilter
+from tools.tracing import tracer
+
+
+@pytest.fixture
+def traced():
+    tracer.clear()
+    tracer.enable()
+    yield tracer
+    tracer.disable()
+    tracer.clear()
+
+
+def test_effects_step_and_draw_inside_a_trace(traced):
+    win = pygame.Surface((32, 32))
+    win.fill((200, 200, 200))
+    effect = ColorFilter(win, (128, 255, 255), None)
+    effect.name = "avernus"
+    effects = Effects([effect])
+
+    effects.step()
+    effects.draw()
+
+    spans = [(event[1], event[6]) for event in traced.events]
+    assert ("ColorFilter.step", {"effect": "avernus"}) in spans
+    assert ("ColorFilter.draw", {"effect": "avernus"}) in spans
+    assert win.get_at((0, 0))[:3] == (100, 200, 200)
+
+
+def test_effects_step_and_draw_with_tracing_off():
+    win = pygame.Surface((32, 32))
+    effects = Effects([ColorFilter(win, (255, 0, 0), None)])
+    effects.step()
+    effects.draw()
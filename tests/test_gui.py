@@ -0,0 +1,32 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from frontend.gui import GUI, TextBox
+
+
+@pytest.fixture
+def events(monkeypatch):
+    pygame.init()
+    pygame.display.set_mode((640, 480))
+    GUI.initialize("./assets/images/gui_config.json")
+    # the game fonts are set up by GameManager, the default pygame font will do
+    monkeypatch.setattr(GUI, "fonts", [pygame.font.Font(None, 16)])
+    events = []
+    handler = GUI.gui_event_handler
+    GUI.gui_event_handler = events.append
+    yield events
+    GUI.gui_event_handler = handler
+
+
+def test_enter_finishes_typing(events):
+    textbox = TextBox("search", "")
+    textbox.start_typing()
+    textbox.type_character("a")
+    textbox.type_character("\r")
+
+    assert [(event["text"], event["state"]) for event in events] == [
+        ("a", "typing"),
+        ("a", "done"),
+    ]
+    assert not textbox.typing
@@ -0,0 +1,59 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from tools.pacing import FramePacer
+
+
+@pytest.fixture
+def pacer():
+    pygame.init()
+    pygame.display.set_mode((64, 64))
+    pygame.event.clear()
+    pacer = FramePacer(max_stashed=3)
+    pacer.notify([pygame.event.Event(pygame.WINDOWMINIMIZED)])
+    assert pacer.minimized
+    yield pacer
+    pygame.event.clear()
+
+
+def test_quit_while_minimized_wakes_the_loop(pacer):
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+    assert pacer.wait_minimized(0.1)
+    assert [event.type for event in pacer.take_stashed_events()] == [pygame.QUIT]
+
+
+def test_window_events_while_minimized_are_stashed_up_to_the_cap(pacer):
+    for _ in range(5):
+        pygame.event.post(pygame.event.Event(pygame.WINDOWMOVED, x=0, y=0))
+        assert not pacer.wait_minimized(0.1)
+    assert pacer.minimized
+    assert len(pacer.take_stashed_events()) == 3
+    assert pacer.take_stashed_events() == []
+
+
+def test_restore_leaves_the_minimized_state(pacer):
+    pygame.event.post(pygame.event.Event(pygame.WINDOWRESTORED))
+    assert not pacer.wait_minimized(0.1)
+    assert not pacer.minimized
+    assert [event.type for event in pacer.take_stashed_events()] == [pygame.WINDOWRESTORED]
+
+
+def test_game_quits_while_minimized(tmp_path):
+    pytest.importorskip("cv2")
+    from tools import renderBenchmark as bench
+
+    game_manager = bench.create_game(tmp_path, map_frames=2)
+    # paced like the game, the benchmark runs unthrottled
+    game_manager.max_fps = 60
+    try:
+        pygame.event.post(pygame.event.Event(pygame.WINDOWMINIMIZED))
+        game_manager.step()
+        assert game_manager.pacer.minimized
+
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+        with pytest.raises(SystemExit):
+            for _ in range(5):
+                game_manager.step()
+    finally:
+        game_manager.shutdown()
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("pygame")
+pytest.importorskip("cv2")
+
+from tools import renderBenchmark as bench
+
+
+@pytest.fixture(scope="module")
+def game_manager(tmp_path_factory):
+    game_manager = bench.create_game(tmp_path_factory.mktemp("bench"), map_frames=4)
+    yield game_manager
+    game_manager.shutdown()
+    bench.pg.quit()
+
+
+@pytest.mark.parametrize("scenario", list(bench.SCENARIOS))
+def test_scenario_runs_headless(game_manager, scenario):
+    result = bench.run_scenario(game_manager, bench.SCENARIOS[scenario], frames=3, warmup=1)
+    assert result["frames"] == 3
+    assert result["fps"] > 0
@@ -0,0 +1,19 @@
+import json
+import pytest
+
+pytest.importorskip("pygame")
+
+from backend.settings import Settings
+
+
+def test_missing_settings_get_their_default(tmp_path):
+    # a settings file from before thumbnail_atlas and search were added
+    path = tmp_path.joinpath("settings.json")
+    path.write_text(json.dumps({"maps_config": "maps.json", "grid": {"size": 40}}))
+    settings = Settings(str(path))
+
+    assert settings.get("maps_config", default="other.json") == "maps.json"
+    assert settings.get("grid", subname="size", default=60) == 40
+    assert settings.get("thumbnail_atlas", default="atlas.json") == "atlas.json"
+    assert settings.get("thumbnail_atlas") is None
+    assert settings.get("search", subname="debounce", default=0.15) == 0.15
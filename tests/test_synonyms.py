@@ -0,0 +1,23 @@
+import sys
+from backend.searchers.synonyms import SynonymsTable
+
+
+def test_update_without_nltk_keeps_words_out_of_the_vocabulary(tmp_path, monkeypatch):
+    # None in sys.modules makes the import fail, as if NLTK was not installed
+    monkeypatch.setitem(sys.modules, "nltk", None)
+    monkeypatch.setitem(sys.modules, "nltk.corpus", None)
+    path = tmp_path.joinpath("synonyms.json")
+    table = SynonymsTable(str(path))
+
+    assert not table.update(["forest", "Old Ruins"])
+    assert table.vocabulary == set()
+    assert table.lookup("forest") == {"forest"}
+    assert table.lookup("old ruins") == {"old_ruins"}
+    assert not path.exists()
+
+
+def test_lookup_falls_back_to_the_stem(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "nltk", None)
+    table = SynonymsTable()
+    table.update(["ruin"])
+    assert table.lookup("ruins") == {"ruin"}
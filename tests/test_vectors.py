@@ -0,0 +1,31 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.searchers.vectors import TrigramVectors, top_k
+
+NAMES = ["Dark Forest", "Forest Ruins", "Sunken Crypt", "Tavern At Night", "River Crossing"]
+TAGS = ["forest night", "forest ruin", "crypt dungeon", "tavern city", ""]
+
+
+def test_weighted_scores_is_the_weighted_sum_of_the_fields():
+    vectors = TrigramVectors(NAMES, TAGS)
+    names = TrigramVectors(NAMES)
+    tags = TrigramVectors(TAGS)
+
+    scores = vectors.weighted_scores(
+        [("forest", 0, 0.6), ("forest", 1, 0.4), ("woods ruin", 1, 0.1)]
+    )
+    expected = 0.6 * names.scores("forest") + 0.4 * tags.scores("forest")
+    expected += 0.1 * tags.scores("woods ruin")
+    assert np.allclose(scores, expected, atol=1e-6)
+    assert np.allclose(vectors.scores("crypt", 1), tags.scores("crypt"), atol=1e-6)
+
+
+def test_scores_are_cosine_similarities():
+    vectors = TrigramVectors(NAMES)
+    scores = vectors.scores("dark forest")
+    assert scores[0] == pytest.approx(1.0, abs=1e-6)
+    assert list(top_k(scores, 2)) == [0, 1]
+    assert not vectors.scores("").any()
+    assert not vectors.weighted_scores([("", 0, 1.0)]).any()
@@ -0,0 +1,38 @@
+import threading
+from backend.searchers.worker import SearchWorker
+
+
+class EchoSearcher:
+    def __init__(self):
+        self.threads = []
+
+    def search(self, query, n=-1):
+        self.threads.append(threading.current_thread())
+        return [query.upper()]
+
+
+def test_inline_worker_returns_the_result_before_submit_returns():
+    searcher = EchoSearcher()
+    results = []
+    worker = SearchWorker(searcher, results.append, debounce=10.0, inline=True)
+
+    generation = worker.submit("cave")
+    assert [(r.generation, r.query, r.matches) for r in results] == [(generation, "cave", ["CAVE"])]
+    assert searcher.threads == [threading.current_thread()]
+    worker.stop()
+
+
+def test_worker_searches_only_the_last_query_after_the_debounce():
+    searcher = EchoSearcher()
+    results = []
+    done = threading.Event()
+    worker = SearchWorker(searcher, lambda r: (results.append(r), done.set()), debounce=0.05)
+
+    worker.submit("c")
+    worker.submit("ca")
+    generation = worker.submit("cave")
+    assert done.wait(2.0)
+    worker.stop()
+
+    assert [(r.generation, r.query) for r in results] == [(generation, "cave")]
+    assert searcher.threads[0] is not threading.current_thread()
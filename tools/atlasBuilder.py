@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+from pathlib import Path
+import pygame
+
+sys.path.append(str(Path(__file__).parent.parent.absolute()))
+from backend.config import Config
+from frontend.tokens import fit_thumbnail
+
+PAGE_SIZE = 2048
+PADDING = 1
+
+
+def pack(surfs, page_size=PAGE_SIZE):
+    """shelf packing: returns a list of (page index, (x, y)) in the order of surfs"""
+    order = sorted(range(len(surfs)), key=lambda i: -surfs[i].get_height())
+    placements = [None] * len(surfs)
+
+    page = 0
+    x = 0
+    y = 0
+    shelf_height = 0
+    for i in order:
+        width, height = surfs[i].get_size()
+        if x + width > page_size:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        if y + height > page_size:
+            page += 1
+            x = 0
+            y = 0
+            shelf_height = 0
+        placements[i] = (page, (x, y))
+        x += width + PADDING
+        shelf_height = max(shelf_height, height)
+
+    return placements
+
+
+def load_maps_thumbnails(maps_config):
+    config = Config(maps_config)
+    thumbnails = {}
+    for map_name in config.maps_names:
+        map_obj = config.get_map(map_name)
+        thumbnails[map_obj.name] = map_obj.thumbnail
+    return thumbnails
+
+
+def load_tokens_thumbnails(tokens_dir):
+    thumbnails = {}
+    for root, _, files in os.walk(tokens_dir):
+        for file in files:
+            if not file.endswith('.png'):
+                continue
+            surf = pygame.image.load(os.path.join(root, file))
+            thumbnails[os.path.basename(file)] = fit_thumbnail(surf)
+    return thumbnails
+
+
+if __name__ == '__main__':
+    with open('./settings.json', 'r') as f:
+        settings = json.load(f)
+
+    atlas_path = Path(settings.get('thumbnail_atlas', 'assets/thumbnails/atlas.json'))
+    sections = {
+        'maps': load_maps_thumbnails(settings.get('maps_config', 'maps.json')),
+        'tokens': load_tokens_thumbnails(settings.get('tokens_path', 'assets/tokens')),
+    }
+
+    names = [(section, name) for section in sections for name in sections[section]]
+    surfs = [sections[section][name] for section, name in names]
+    placements = pack(surfs)
+
+    num_pages = max([page for page, _ in placements], default=-1) + 1
+    pages = [pygame.Surface((PAGE_SIZE, PAGE_SIZE), pygame.SRCALPHA) for _ in range(num_pages)]
+
+    dic = {'pages': [], 'maps': {}, 'tokens': {}}
+    for (section, name), surf, (page, pos) in zip(names, surfs, placements):
+        pages[page].blit(surf, pos)
+        dic[section][name] = [page, [list(pos), list(surf.get_size())]]
+
+    for i, page in enumerate(pages):
+        page_path = atlas_path.with_name(f'{atlas_path.stem}_{i}.png')
+        pygame.image.save(page, str(page_path))
+        dic['pages'].append(f'./{page_path.as_posix()}')
+
+    with open(atlas_path, 'w') as outfile:
+        outfile.write(json.dumps(dic, indent=4))
+
+    print(f'packed {len(surfs)} thumbnails into {num_pages} pages')
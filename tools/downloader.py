@@ -6,11 +6,11 @@ from threading import Thread
 from functools import partial
 from pytube import YouTube
 import cv2
-from nltk.tokenize import word_tokenize
 from tqdm import tqdm
 
 sys.path.append(str(Path(__file__).parent.parent.absolute()))
 from backend.config import Map
+from backend.text import tokenize
 
 
 class MapsDownloader:
@@ -22,8 +22,7 @@ class MapsDownloader:
     def __generate_default_tags(self, map_name: str) -> List[str]:
         # clean map name from unicode characters, special characters and spaces
         map_name = map_name.encode("ascii", "ignore").decode("ascii")
-        map_name.strip().lower()
-        tags = word_tokenize(map_name)
+        tags = tokenize(map_name)
         return tags
 
     def __on_progress(
@@ -0,0 +1,144 @@
+from time import perf_counter
+from typing import List
+from collections import deque
+import pygame
+
+WINDOW_EVENTS = (
+    pygame.WINDOWSHOWN,
+    pygame.WINDOWHIDDEN,
+    pygame.WINDOWEXPOSED,
+    pygame.WINDOWMOVED,
+    pygame.WINDOWRESIZED,
+    pygame.WINDOWSIZECHANGED,
+    pygame.WINDOWMINIMIZED,
+    pygame.WINDOWMAXIMIZED,
+    pygame.WINDOWRESTORED,
+    pygame.WINDOWENTER,
+    pygame.WINDOWLEAVE,
+    pygame.WINDOWFOCUSGAINED,
+    pygame.WINDOWFOCUSLOST,
+    pygame.ACTIVEEVENT,
+    pygame.VIDEOEXPOSE,
+    pygame.VIDEORESIZE,
+)
+
+
+class FramePacer:
+    """Chooses the frame rate of the game loop and waits for the next frame.
+
+    The loop runs at the active rate while something animates or the user did something in the
+    last idle_after seconds, at idle_fps otherwise, at most at unfocused_fps while the window
+    is in the background and not at all while it is minimized. An idle frame waits on the event
+    queue, so input wakes the loop immediately; the event is stashed for the next frame.
+    While minimized only window events are stashed, at most max_stashed of them, any other
+    event (e.g. closing the window from the taskbar) wakes the loop for one frame.
+
+    Args:
+        idle_fps (int): The frame rate when nothing happens.
+        unfocused_fps (int): The highest frame rate while the window is not focused.
+        idle_after (float): Seconds without activity before going idle.
+        max_stashed (int): The most events kept for the next frame, the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        idle_fps: int = 10,
+        unfocused_fps: int = 15,
+        idle_after: float = 2.0,
+        max_stashed: int = 256,
+    ) -> None:
+        self.idle_fps = idle_fps
+        self.unfocused_fps = unfocused_fps
+        self.idle_after = idle_after
+        self.minimized = False
+        self.focused = True
+        self.__stashed_events = deque(maxlen=max_stashed)
+        self.__last_activity = perf_counter()
+        self.__last_frame = perf_counter()
+
+    def notify(self, events: List[pygame.event.Event]) -> None:
+        """Track the window state and the user activity from the events of a frame.
+
+        Args:
+            events (List[pygame.event.Event]): The events of the frame.
+        """
+        for event in events:
+            if event.type == pygame.WINDOWMINIMIZED or event.type == pygame.WINDOWHIDDEN:
+                self.minimized = True
+            elif event.type in (
+                pygame.WINDOWRESTORED,
+                pygame.WINDOWMAXIMIZED,
+                pygame.WINDOWSHOWN,
+                pygame.WINDOWEXPOSED,
+            ):
+                self.minimized = False
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                self.focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                self.focused = True
+        if events:
+            self.activity()
+
+    def activity(self) -> None:
+        """Something changed on screen or the user did something, stay at the active rate."""
+        self.__last_activity = perf_counter()
+
+    @property
+    def idle(self) -> bool:
+        return perf_counter() - self.__last_activity > self.idle_after
+
+    def take_stashed_events(self) -> List[pygame.event.Event]:
+        events = list(self.__stashed_events)
+        self.__stashed_events.clear()
+        return events
+
+    def get_fps(self, active_fps: int, animating: bool = False) -> int:
+        """Get the frame rate for the next frame.
+
+        Args:
+            active_fps (int): The frame rate while active, e.g. the native rate of the map video.
+            animating (bool, optional): Something moves on its own. Defaults to False.
+
+        Returns:
+            int: The frame rate.
+        """
+        fps = active_fps if animating or not self.idle else min(active_fps, self.idle_fps)
+        if not self.focused:
+            fps = min(fps, self.unfocused_fps)
+        return fps
+
+    def wait(self, clock: pygame.time.Clock, fps: int) -> None:
+        """Wait for the next frame, idle frames return as soon as an event arrives.
+
+        Args:
+            clock (pygame.time.Clock): The clock of the game loop.
+            fps (int): The frame rate from get_fps.
+        """
+        if not self.idle:
+            clock.tick(fps)
+        else:
+            remaining = 1.0 / fps - (perf_counter() - self.__last_frame)
+            if remaining > 0:
+                event = pygame.event.wait(int(remaining * 1000))
+                if event.type != pygame.NOEVENT:
+                    self.__stashed_events.append(event)
+            clock.tick()
+        self.__last_frame = perf_counter()
+
+    def wait_minimized(self, timeout: float = 1.0) -> bool:
+        """Sleep until an event arrives (e.g. the window is restored) instead of rendering.
+
+        Args:
+            timeout (float, optional): The longest sleep in seconds. Defaults to 1.0.
+
+        Returns:
+            bool: Whether an event that is not a window event arrived, e.g. QUIT, the stashed
+            events have to be handled by a frame then.
+        """
+        event = pygame.event.wait(int(timeout * 1000))
+        self.__last_frame = perf_counter()
+        if event.type == pygame.NOEVENT:
+            return False
+        self.__stashed_events.append(event)
+        self.notify([event])
+        return event.type not in WINDOW_EVENTS
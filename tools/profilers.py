@@ -1,9 +1,14 @@
+import csv
+from collections import deque
 from functools import wraps
-from line_profiler import LineProfiler
-from memory_profiler import profile as memory_profiler
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+import pygame
 
 
 def time_profiler(func):
+    from line_profiler import LineProfiler
+
     profiler = LineProfiler()
 
     @wraps(func)
@@ -16,9 +21,178 @@ def time_profiler(func):
 
 
 def memory_profiler(func):
+    from memory_profiler import profile
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        result = memory_profiler(func)(*args, **kwargs)
+        result = profile(func)(*args, **kwargs)
         return result
 
     return wrapper
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values (List[float]): The values, sorted ascending.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, 0.0 for no values.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """Times the stages of every frame of the game loop and keeps rolling statistics.
+
+    A frame is opened with begin_frame, every call to mark(stage) charges the time since the
+    previous mark to that stage and end_frame closes it. The statistics can be shown as an
+    on-screen HUD or dumped to CSV.
+
+    Args:
+        history (int): The number of frames the statistics are computed over.
+        hud_interval (int): Render the HUD again every this many frames.
+        tracer (Any, optional): A tools.tracing.Tracer, stages and frames are also recorded as spans.
+    """
+
+    TOTAL = "total"
+
+    def __init__(self, history: int = 240, hud_interval: int = 30, tracer: Any = None) -> None:
+        self.history = history
+        self.hud_interval = hud_interval
+        self.tracer = tracer
+        self.show_hud = False
+        self.frames = deque(maxlen=history)
+        # stage names in the order they were first marked
+        self.stages = []
+        self.__current = None
+        self.__frame_start = 0.0
+        self.__last_mark = 0.0
+        self.__frames_since_hud = 0
+        self.__hud = None
+
+    def begin_frame(self) -> None:
+        self.__current = {}
+        self.__frame_start = perf_counter()
+        self.__last_mark = self.__frame_start
+
+    def mark(self, stage: str) -> None:
+        """Charge the time since the previous mark to stage.
+
+        Args:
+            stage (str): The name of the stage that just ended.
+        """
+        if self.__current is None:
+            return
+        now = perf_counter()
+        if stage not in self.__current and stage not in self.stages:
+            self.stages.append(stage)
+        self.__current[stage] = (
+            self.__current.get(stage, 0.0) + (now - self.__last_mark) * 1000
+        )
+        if self.tracer is not None:
+            self.tracer.add_complete(stage, "frame", self.__last_mark, now)
+        self.__last_mark = now
+
+    def end_frame(self) -> None:
+        if self.__current is None:
+            return
+        now = perf_counter()
+        self.__current[FrameProfiler.TOTAL] = (now - self.__frame_start) * 1000
+        if self.tracer is not None:
+            self.tracer.add_complete("frame", "frame", self.__frame_start, now)
+        self.frames.append(self.__current)
+        self.__current = None
+        self.__frames_since_hud += 1
+
+    def toggle_hud(self) -> None:
+        self.show_hud = not self.show_hud
+        self.__hud = None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get the statistics of every stage over the kept frames.
+
+        Returns:
+            Dict[str, Dict[str, float]]: stage -> {'avg', 'p95', 'p99', 'max'} in milliseconds.
+        """
+        stats = {}
+        for stage in self.stages + [FrameProfiler.TOTAL]:
+            values = sorted(frame.get(stage, 0.0) for frame in self.frames)
+            stats[stage] = {
+                "avg": sum(values) / len(values) if values else 0.0,
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": values[-1] if values else 0.0,
+            }
+        return stats
+
+    def dump_csv(self, path: str) -> None:
+        """Write the kept frames to a CSV file, one row per frame, times in milliseconds.
+
+        Args:
+            path (str): The path of the CSV file.
+        """
+        columns = self.stages + [FrameProfiler.TOTAL]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + columns)
+            for index, frame in enumerate(self.frames):
+                writer.writerow(
+                    [index] + [f"{frame.get(stage, 0.0):.3f}" for stage in columns]
+                )
+
+    def render_hud(self, font: Any, color: Any = None) -> pygame.Surface:
+        """Render the statistics table, at most once every hud_interval frames.
+
+        Args:
+            font (Any): A font with a render(text, antialias, color) method.
+            color (Any, optional): The text color. Defaults to None.
+
+        Returns:
+            pygame.Surface: The rendered HUD.
+        """
+        if self.__hud is not None and self.__frames_since_hud < self.hud_interval:
+            return self.__hud
+        self.__frames_since_hud = 0
+
+        lines = [f"{'stage':<14}{'avg':>8}{'p95':>8}{'p99':>8}"]
+        for stage, stage_stats in self.stats().items():
+            lines.append(
+                f"{stage:<14}{stage_stats['avg']:>8.2f}"
+                f"{stage_stats['p95']:>8.2f}{stage_stats['p99']:>8.2f}"
+            )
+        # the numbers change every time, keep them out of the font's cache
+        render = getattr(font, "render_uncached", None)
+        if render is not None:
+            surfs = [render(line, color) for line in lines]
+        else:
+            surfs = [font.render(line, True, color) for line in lines]
+
+        line_height = max(surf.get_height() for surf in surfs)
+        width = max(surf.get_width() for surf in surfs)
+        hud = pygame.Surface(
+            (int(width) + 20, int(line_height) * len(surfs) + 20), pygame.SRCALPHA
+        )
+        hud.fill((0, 0, 0, 160))
+        for i, surf in enumerate(surfs):
+            hud.blit(surf, (10, 10 + i * line_height))
+        self.__hud = hud
+        return hud
+
+    def get_hud_rect(self, pos: tuple = (10, 10)) -> Optional[pygame.Rect]:
+        """Get the screen rect of the last rendered HUD.
+
+        Args:
+            pos (tuple, optional): Where the HUD is drawn. Defaults to (10, 10).
+
+        Returns:
+            Optional[pygame.Rect]: The rect or None before the first render.
+        """
+        if self.__hud is None:
+            return None
+        return self.__hud.get_rect(topleft=pos)
@@ -0,0 +1,173 @@
+import gzip
+import json
+from time import perf_counter
+from typing import Any, Dict, List
+import pygame
+
+
+FORMAT_VERSION = 1
+
+
+def serialize_event(event: pygame.event.Event) -> List[Any]:
+    """Convert an event to a JSON friendly [type, attributes] pair.
+
+    Attributes that cannot be stored (e.g. window objects) are dropped.
+
+    Args:
+        event (pygame.event.Event): The event.
+
+    Returns:
+        List[Any]: The event type and its attributes.
+    """
+    attributes = {}
+    for key, value in event.dict.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        if value is None or isinstance(value, (bool, int, float, str, list)):
+            attributes[key] = value
+    return [event.type, attributes]
+
+
+def deserialize_event(data: List[Any]) -> pygame.event.Event:
+    """Rebuild an event stored by serialize_event.
+
+    Args:
+        data (List[Any]): The event type and its attributes.
+
+    Returns:
+        pygame.event.Event: The event.
+    """
+    event_type, attributes = data
+    attributes = {
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in attributes.items()
+    }
+    return pygame.event.Event(event_type, attributes)
+
+
+class InputRecorder:
+    """Records the input of every frame of the game into a gzip compressed JSON file.
+
+    A frame is stored as [time since the first frame, mouse position, key modifiers, events],
+    everything the game polls or handles, so a replay sees exactly the same input.
+
+    Args:
+        path (str): The path of the recording.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.frames = []
+        self.__start = None
+        self.__resolution = None
+
+    def record_frame(self, events: List[pygame.event.Event]) -> None:
+        """Record the input handled in this frame.
+
+        Args:
+            events (List[pygame.event.Event]): The events of the frame.
+        """
+        now = perf_counter()
+        if self.__start is None:
+            self.__start = now
+            surface = pygame.display.get_surface()
+            self.__resolution = list(surface.get_size()) if surface else None
+        self.frames.append(
+            [
+                round(now - self.__start, 6),
+                list(pygame.mouse.get_pos()),
+                pygame.key.get_mods(),
+                [serialize_event(event) for event in events],
+            ]
+        )
+
+    def save(self) -> None:
+        content = {
+            "version": FORMAT_VERSION,
+            "resolution": self.__resolution,
+            "frames": self.frames,
+        }
+        with gzip.open(self.path, "wt") as f:
+            json.dump(content, f, separators=(",", ":"))
+
+
+class InputReplayer:
+    """Feeds a recording made by InputRecorder back to the game, one recorded frame per frame.
+
+    install patches pygame.mouse.get_pos and pygame.key.get_mods to report the recorded
+    values, so the replay does not depend on the real mouse or on wall-clock timing.
+
+    Args:
+        path (str): The path of the recording.
+    """
+
+    def __init__(self, path: str) -> None:
+        with gzip.open(path, "rt") as f:
+            content = json.load(f)
+        if content["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {content['version']}")
+        self.resolution = content["resolution"]
+        self.frames = content["frames"]
+        self.index = 0
+        self.__mouse_pos = (0, 0)
+        self.__mods = 0
+        self.__start = None
+        self.__end = None
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= len(self.frames)
+
+    def install(self) -> None:
+        pygame.mouse.get_pos = lambda: self.__mouse_pos
+        pygame.key.get_mods = lambda: self.__mods
+
+    def next_events(self) -> List[pygame.event.Event]:
+        """Get the events of the next recorded frame, the real events are discarded.
+
+        Returns:
+            List[pygame.event.Event]: The recorded events, empty after the last frame.
+        """
+        # keep the real event queue empty, the os still posts to it
+        pygame.event.pump()
+        pygame.event.clear()
+        now = perf_counter()
+        if self.__start is None:
+            self.__start = now
+        if self.finished:
+            return []
+
+        _, mouse_pos, mods, events = self.frames[self.index]
+        self.index += 1
+        self.__mouse_pos = tuple(mouse_pos)
+        self.__mods = mods
+        if self.finished:
+            self.__end = now
+        return [deserialize_event(event) for event in events]
+
+    def report(self, profiler: Any = None) -> Dict[str, Any]:
+        """Get the statistics of the replay.
+
+        Args:
+            profiler (Any, optional): The tools.profilers.FrameProfiler of the replay. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: frames, recorded and replayed duration, FPS and frame time percentiles.
+        """
+        replayed = 0.0
+        if self.__start is not None:
+            replayed = (self.__end or perf_counter()) - self.__start
+        recorded = self.frames[-1][0] if self.frames else 0.0
+        report = {
+            "frames": self.index,
+            "recorded_frames": len(self.frames),
+            "recorded_seconds": recorded,
+            "replayed_seconds": replayed,
+            "fps": self.index / replayed if replayed else 0.0,
+        }
+        if profiler is not None:
+            report["frame_ms"] = profiler.stats()[profiler.TOTAL]
+        return report
@@ -0,0 +1,262 @@
+""" headless benchmark of the map render loop.
+runs GameManager.run_map over synthetic maps and tokens with the SDL dummy video driver
+and prints FPS, frame time percentiles and peak RSS as JSON:
+
+    python tools/renderBenchmark.py --frames 300 --output bench.json
+"""
+
+import sys
+import os
+import json
+import random
+import resource
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+# no display needed, must be set before pygame creates the window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(ROOT))
+# the game loads its gui assets relative to the repository
+os.chdir(ROOT)
+
+import cv2
+import numpy as np
+import pygame as pg
+import main as game
+from backend.factories import SimpleFactory
+from backend.settings import Settings
+from frontend.gui import GUI
+from frontend.effects import DarknessEffect
+from frontend.tokens import TokenSurf
+from tools.profilers import FrameProfiler, percentile
+
+WIDTH = 1920
+HEIGHT = 1080
+
+
+class BenchmarkFactory(SimpleFactory):
+    """SimpleFactory reading the settings written next to the synthetic assets"""
+
+    workdir: Path = None
+
+    @staticmethod
+    def create_settings(settings_file: str) -> Settings:
+        return Settings(str(BenchmarkFactory.workdir.joinpath("settings.json")))
+
+    @staticmethod
+    def create_db_searcher():
+        # no database on a benchmark box, the render loop does not use it
+        return None
+
+
+def write_map_video(path, frames, fps=30):
+    """a moving gradient, decoded like any downloaded map"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (WIDTH, HEIGHT))
+    x = np.linspace(0, 255, WIDTH, dtype=np.float32)
+    y = np.linspace(0, 255, HEIGHT, dtype=np.float32)[:, None]
+    for i in range(frames):
+        frame = np.empty((HEIGHT, WIDTH, 3), np.uint8)
+        frame[:, :, 0] = (x + i * 4) % 256
+        frame[:, :, 1] = (y + i * 2) % 256
+        frame[:, :, 2] = ((x + y) / 2 + i) % 256
+        writer.write(frame)
+    writer.release()
+
+
+def write_token_image(path, rng):
+    """a colored disc on white, the background is removed when the token is loaded"""
+    image = np.full((256, 256, 3), 255, np.uint8)
+    color = tuple(int(c) for c in rng.integers(0, 200, 3))
+    cv2.circle(image, (128, 128), 110, color, -1)
+    cv2.imwrite(str(path), image)
+
+
+def create_assets(workdir, num_maps, map_frames, num_tokens):
+    rng = np.random.default_rng(0)
+    maps_dir = workdir.joinpath("maps")
+    tokens_dir = workdir.joinpath("tokens")
+    maps_dir.mkdir()
+    tokens_dir.mkdir()
+
+    maps = []
+    for i in range(num_maps):
+        video_path = maps_dir.joinpath(f"map_{i}.mp4")
+        thumbnail_path = maps_dir.joinpath(f"map_{i}.png")
+        write_map_video(video_path, map_frames)
+        cv2.imwrite(str(thumbnail_path), np.zeros((180, 320, 3), np.uint8))
+        maps.append(
+            {
+                "name": f"benchmark map {i}",
+                "path": str(video_path),
+                "tags": ["benchmark"],
+                "thumbnail": str(thumbnail_path),
+                "url": "",
+                "favorite": False,
+            }
+        )
+    with open(workdir.joinpath("maps.json"), "w") as f:
+        json.dump(maps, f, indent=2)
+
+    for i in range(num_tokens):
+        write_token_image(tokens_dir.joinpath(f"token_{i}.png"), rng)
+
+    background_path = workdir.joinpath("background.png")
+    cv2.imwrite(str(background_path), np.zeros((HEIGHT, WIDTH, 3), np.uint8))
+
+    with open(ROOT.joinpath("settings.json"), "r") as f:
+        settings = json.load(f)
+    settings["maps_config"] = str(workdir.joinpath("maps.json"))
+    settings["tokens_path"] = str(tokens_dir)
+    settings["thumbnail_atlas"] = str(workdir.joinpath("no_atlas.json"))
+    settings["background"] = str(background_path)
+    settings["resolution"] = {"width": WIDTH, "height": HEIGHT}
+    with open(workdir.joinpath("settings.json"), "w") as f:
+        json.dump(settings, f, indent=2)
+
+
+def reset(game_manager):
+    game_manager.map_zoom = 1.0
+    game_manager.map_offset = (0, 0)
+    game_manager.grid_state = game.Grid.NONE
+    game_manager.tokens.tokens.clear()
+    game_manager.effects.clear()
+
+
+def setup_static(game_manager):
+    pass
+
+
+def setup_zoomed(game_manager):
+    game_manager.map_zoom = 1.5
+    game_manager.map_offset = (-WIDTH * 0.25, -HEIGHT * 0.25)
+
+
+def setup_hex_grid(game_manager):
+    game_manager.grid_state = game.Grid.HEX
+
+
+def setup_tokens(game_manager):
+    rng = random.Random(0)
+    tokens = game_manager.tokens.available_tokens
+    for i in range(50):
+        token = TokenSurf(pg.image.load(tokens[i % len(tokens)]["path"]), 100)
+        token.pos = (rng.randrange(WIDTH), rng.randrange(HEIGHT))
+        game_manager.tokens.append(token)
+
+
+def setup_lights(game_manager):
+    rng = random.Random(0)
+    darkness = DarknessEffect(game_manager.screen, game_manager.controls)
+    for _ in range(20):
+        darkness.create_light_source((rng.randrange(WIDTH), rng.randrange(HEIGHT)), 100)
+    game_manager.effects.append(darkness)
+
+
+def setup_filters(game_manager):
+    game_manager.apply_color_filter((228, 117, 117), "avernus", True)
+    game_manager.apply_color_filter((243, 171, 78), "mexico", True)
+    game_manager.apply_color_filter((150, 234, 141), "matrix", True)
+
+
+SCENARIOS = {
+    "static": setup_static,
+    "zoomed": setup_zoomed,
+    "hex_grid": setup_hex_grid,
+    "tokens_50": setup_tokens,
+    "lights_20": setup_lights,
+    "stacked_filters": setup_filters,
+}
+
+
+def create_game(workdir, map_frames, num_maps=2, num_tokens=8):
+    """a game over synthetic assets written to workdir, unthrottled and playing its first map"""
+    BenchmarkFactory.workdir = workdir
+    create_assets(workdir, num_maps, map_frames, num_tokens)
+
+    pg.init()
+    GUI.gui_event_handler = game.handle_gui_events
+    GUI.initialize("./assets/images/gui_config.json")
+
+    game_manager = game.GameManager(factory=BenchmarkFactory)
+    game_manager.max_fps = 0
+    game_manager.setup()
+    game_manager.add_event(
+        game.GameEvent(game.Event.CHANGE_MAP, game_manager.config.maps_names[0])
+    )
+    # close the main menu the way choosing a map does
+    GUI.elements.remove(game_manager.menu_manager.current_menu)
+    game_manager.menu_manager.current_menu = None
+    return game_manager
+
+
+def run_scenario(game_manager, setup, frames, warmup):
+    reset(game_manager)
+    setup(game_manager)
+    for _ in range(warmup):
+        game_manager.step()
+
+    profiler = FrameProfiler(history=frames)
+    game_manager.profiler = profiler
+    start = perf_counter()
+    for _ in range(frames):
+        game_manager.step()
+    elapsed = perf_counter() - start
+
+    totals = sorted(frame[FrameProfiler.TOTAL] for frame in profiler.frames)
+    stages = profiler.stats()
+    del stages[FrameProfiler.TOTAL]
+    return {
+        "frames": frames,
+        "fps": frames / elapsed,
+        "frame_ms": {
+            "avg": sum(totals) / len(totals),
+            "p50": percentile(totals, 0.5),
+            "p95": percentile(totals, 0.95),
+            "p99": percentile(totals, 0.99),
+            "max": totals[-1],
+        },
+        "stages_ms": {
+            stage: {"avg": stats["avg"], "p95": stats["p95"]} for stage, stats in stages.items()
+        },
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="frames run before measuring")
+    parser.add_argument("--map-frames", type=int, default=60, help="length of the synthetic videos")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--output", type=str, help="write the JSON report to a file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dnd_vtt_bench_") as workdir:
+        game_manager = create_game(Path(workdir), args.map_frames)
+
+        report = {
+            "driver": pg.display.get_driver(),
+            "resolution": [WIDTH, HEIGHT],
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            report["scenarios"][name] = run_scenario(
+                game_manager, SCENARIOS[name], args.frames, args.warmup
+            )
+            print(f"{name}: {report['scenarios'][name]['fps']:.1f} fps", file=sys.stderr)
+        report["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        pg.quit()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
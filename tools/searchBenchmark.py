@@ -0,0 +1,199 @@
+""" quality and latency benchmark of the map searching strategies.
+runs the queries of tools/search_queries.json (with the maps expected in their results)
+against every strategy, over maps.json and over synthetic catalogs scaled up from its tags,
+and prints JSON with index build time and memory, latency percentiles, recall@k and MRR:
+
+    python tools/searchBenchmark.py --sizes 0 10000 100000 --output search_bench.json
+
+size 0 is maps.json alone. the synthetic maps are distractors made of the same words, only
+the real maps are expected, so the quality numbers of different sizes compare strategies
+rather than measure absolute relevance.
+"""
+
+import sys
+import json
+import random
+import shutil
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from pathlib import Path
+from time import perf_counter
+
+ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(ROOT))
+
+from backend.config import Config
+from backend.searchers.strategies import BasicMapSearchingStrategy, ScoredMapSearchingStrategy
+from backend.searchers.synonyms import maps_synonyms_path
+from tools.profilers import percentile
+
+STRATEGIES = {
+    "basic": lambda config: BasicMapSearchingStrategy(config),
+    "scored": lambda config: ScoredMapSearchingStrategy(config),
+    "scored_fast": lambda config: ScoredMapSearchingStrategy(config, fast=True),
+}
+KS = (1, 5, 10)
+
+
+def load_queries(path):
+    with open(path, "r") as f:
+        queries = json.load(f)
+    for query in queries:
+        query["expected"] = {name.title() for name in query["expected"]}
+    return queries
+
+
+def write_catalog(maps_config, size, workdir, seed=0):
+    """maps.json plus synthetic maps up to size, named and tagged with words of its tags"""
+    with open(maps_config, "r") as f:
+        maps = json.load(f)
+
+    # words as often as the real maps use them, numbers and punctuation left out
+    words = Counter(tag for item in maps for tag in item["tags"] if tag.isalpha())
+    vocabulary = list(words)
+    weights = [words[word] for word in vocabulary]
+    rng = random.Random(seed)
+    for i in range(max(0, size - len(maps))):
+        tags = rng.choices(vocabulary, weights, k=rng.randint(2, 5))
+        maps.append(
+            {
+                # the number keeps the names unique
+                "name": f"{' '.join(tags)} {i}",
+                "path": f"assets/maps/synthetic_{i}.mp4",
+                "tags": tags,
+                "thumbnail": f"assets/thumbnails/synthetic_{i}.jpg",
+                "url": "",
+                "favorite": False,
+            }
+        )
+
+    path = Path(workdir).joinpath(f"maps_{size}.json")
+    with open(path, "w") as f:
+        json.dump(maps, f)
+    # the synthetic tags are words of the real ones, their synonyms are known already
+    synonyms = Path(maps_synonyms_path(maps_config))
+    if synonyms.exists():
+        shutil.copy(synonyms, maps_synonyms_path(str(path)))
+    return str(path)
+
+
+def recall_at_k(results, expected, k):
+    """the share of the expected maps in the top k, out of as many as fit in k"""
+    return len(expected.intersection(results[:k])) / min(k, len(expected))
+
+
+def reciprocal_rank(results, expected):
+    for rank, name in enumerate(results, start=1):
+        if name in expected:
+            return 1.0 / rank
+    return 0.0
+
+
+def measure_build(factory, config):
+    start = perf_counter()
+    strategy = factory(config)
+    build_time = perf_counter() - start
+
+    # a second build with allocation tracing on, it slows the build down
+    del strategy
+    tracemalloc.start()
+    strategy = factory(config)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return strategy, {
+        "build_s": build_time,
+        "retained_kb": retained / 1024,
+        "peak_kb": peak / 1024,
+    }
+
+
+def measure_queries(strategy, queries, repeat):
+    # first use warms the caches
+    strategy.search(queries[0]["query"])
+
+    timings = []
+    results = {}
+    for _ in range(repeat):
+        # the queries follow each other like a user typing different searches
+        for query in queries:
+            start = perf_counter()
+            matches = strategy.search(query["query"])
+            timings.append((perf_counter() - start) * 1000)
+            results[query["query"]] = matches
+    timings.sort()
+
+    by_kind = defaultdict(list)
+    for query in queries:
+        by_kind[query["kind"]].append(query)
+
+    def quality(group):
+        report = {}
+        for k in KS:
+            report[f"recall@{k}"] = sum(
+                recall_at_k(results[query["query"]], query["expected"], k) for query in group
+            ) / len(group)
+        report["mrr"] = sum(
+            reciprocal_rank(results[query["query"]], query["expected"]) for query in group
+        ) / len(group)
+        return report
+
+    return {
+        "latency_ms": {
+            "avg": sum(timings) / len(timings),
+            "p50": percentile(timings, 0.5),
+            "p99": percentile(timings, 0.99),
+            "max": timings[-1],
+        },
+        **quality(queries),
+        "by_kind": {kind: quality(group) for kind, group in sorted(by_kind.items())},
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=[0, 10000, 100000],
+        help="number of maps, 0 for maps.json alone",
+    )
+    parser.add_argument(
+        "--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES)
+    )
+    parser.add_argument("--queries", type=str, default=str(ROOT.joinpath("tools", "search_queries.json")))
+    parser.add_argument("--maps-config", type=str, default=str(ROOT.joinpath("maps.json")))
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every query")
+    parser.add_argument("--output", type=str, help="write the JSON report to a file")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    report = {"queries": len(queries), "repeat": args.repeat, "sizes": {}}
+    with tempfile.TemporaryDirectory(prefix="dnd_vtt_search_bench_") as workdir:
+        for size in args.sizes:
+            start = perf_counter()
+            config = Config(write_catalog(args.maps_config, size, workdir))
+            size_report = {
+                "maps": len(config.maps_names),
+                "config_load_s": perf_counter() - start,
+                "strategies": {},
+            }
+            for name in args.strategies:
+                strategy, build = measure_build(STRATEGIES[name], config)
+                size_report["strategies"][name] = {
+                    **build,
+                    **measure_queries(strategy, queries, args.repeat),
+                }
+                result = size_report["strategies"][name]
+                print(
+                    f"{len(config.maps_names)} maps, {name}: "
+                    f"p50 {result['latency_ms']['p50']:.2f} ms, mrr {result['mrr']:.3f}",
+                    file=sys.stderr,
+                )
+            report["sizes"][str(len(config.maps_names))] = size_report
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
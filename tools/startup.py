@@ -0,0 +1,102 @@
+import builtins
+import sys
+import threading
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Dict, List
+
+
+class StartupReport:
+    """Times the startup of the game up to its first frame, by import and by init step.
+
+    enable installs an import hook: every module imported by the main thread is timed, and its
+    time without the modules it imported itself is added to its top level package, so NumPy
+    importing its own submodules is counted once, under "numpy". mark closes an init step: the
+    time since the previous mark, imports made meanwhile included. finish stops the measure and
+    returns the report.
+
+    The interpreter startup, before the hook is installed, is not counted.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.__start = 0.0
+        self.__last = 0.0
+        self.__steps = {}
+        self.__imports = defaultdict(float)
+        # time spent by the imports nested in each import being timed
+        self.__nested = []
+        self.__import = None
+        self.__report = None
+
+    @property
+    def finished(self) -> bool:
+        return self.__report is not None
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self.__start = self.__last = perf_counter()
+        self.__import = builtins.__import__
+        builtins.__import__ = self.__timed_import
+
+    def __timed_import(
+        self,
+        name: str,
+        globals: Dict[str, Any] = None,
+        locals: Dict[str, Any] = None,
+        fromlist: List[str] = (),
+        level: int = 0,
+    ) -> Any:
+        # loaded modules cost a dict lookup, imports of other threads would mix their times
+        if (
+            level != 0
+            or name in sys.modules
+            or threading.current_thread() is not threading.main_thread()
+        ):
+            return self.__import(name, globals, locals, fromlist, level)
+
+        start = perf_counter()
+        self.__nested.append(0.0)
+        try:
+            return self.__import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = perf_counter() - start
+            nested = self.__nested.pop()
+            if self.__nested:
+                self.__nested[-1] += elapsed
+            self.__imports[name.partition(".")[0]] += elapsed - nested
+
+    def mark(self, step: str) -> None:
+        """end the init step named step"""
+        if not self.enabled or self.finished:
+            return
+        now = perf_counter()
+        self.__steps[step] = self.__steps.get(step, 0.0) + now - self.__last
+        self.__last = now
+
+    def finish(self, budget: float = None) -> Dict[str, Any]:
+        """stop measuring, called once the first frame is shown. budget is the time to first
+        frame aimed for, in seconds"""
+        if self.finished:
+            return self.__report
+        self.mark("first frame")
+        builtins.__import__ = self.__import
+
+        first_frame = self.__last - self.__start
+        imports = sorted(self.__imports.items(), key=lambda item: item[1], reverse=True)
+        self.__report = {
+            "first_frame_s": first_frame,
+            "imports_s": sum(self.__imports.values()),
+            "steps_s": dict(self.__steps),
+            "imports_by_package_s": dict(imports),
+        }
+        if budget is not None:
+            self.__report["budget_s"] = budget
+            self.__report["within_budget"] = first_frame <= budget
+        return self.__report
+
+
+# the shared startup report, enabled by main.py with --startup-report
+startup = StartupReport()
@@ -0,0 +1,40 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.absolute()))
+from backend.searchers.synonyms import SynonymsTable, maps_synonyms_path, tokens_synonyms_path
+from backend.text import tokenize
+
+
+def load_maps_tags(maps_config):
+    with open(maps_config, 'r') as f:
+        content = json.load(f)
+    return {tag.strip().lower() for item in content for tag in item['tags']}
+
+
+def load_tokens_words(tokens_dir):
+    # the names of the tokens are their file names, no need to load the images
+    words = set()
+    for path in Path(tokens_dir).glob('*.png'):
+        words |= set(tokenize(path.stem))
+    return words
+
+
+def build(words, path):
+    table = SynonymsTable()
+    if not table.update(words):
+        print(f'no synonyms for {path}, install NLTK and run nltk.download(\'wordnet\')')
+        return
+    table.save(path)
+    print(f'{len(table.vocabulary)} words, {len(table)} lemmas -> {path}')
+
+
+if __name__ == '__main__':
+    with open('./settings.json', 'r') as f:
+        settings = json.load(f)
+
+    maps_config = settings.get('maps_config', 'maps.json')
+    tokens_dir = settings.get('tokens_path', 'assets/tokens')
+    build(load_maps_tags(maps_config), maps_synonyms_path(maps_config))
+    build(load_tokens_words(tokens_dir), tokens_synonyms_path(tokens_dir))
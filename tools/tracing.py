@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+from collections import deque
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+
+
+class Span:
+    """Context manager recording one complete event into a Tracer."""
+
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(
+        self, tracer: "Tracer", name: str, category: str, args: Optional[Dict[str, Any]]
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.tracer.add_complete(self.name, self.category, self.start, perf_counter(), self.args)
+        return False
+
+
+class NullSpan:
+    """The span handed out while tracing is disabled, does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Records spans of the game into a ring buffer and exports them as Chrome trace-event
+    JSON, which can be opened with chrome://tracing or https://ui.perfetto.dev.
+
+    Recording is off until enable is called, a disabled tracer costs one attribute check per
+    span. Spans are recorded from any thread, every thread gets its own track.
+
+    Args:
+        capacity (int): The number of events kept, the oldest events are dropped first.
+    """
+
+    def __init__(self, capacity: int = 200_000) -> None:
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+        self.thread_names = {}
+        self.__origin = perf_counter()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def span(self, name: str, category: str = "main", **args: Any) -> Span | NullSpan:
+        """Time a block of code.
+
+        Args:
+            name (str): The name of the span.
+            category (str, optional): The category of the span. Defaults to "main".
+            **args (Any): Values shown with the span.
+
+        Returns:
+            Span | NullSpan: A context manager recording the span.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args or None)
+
+    def traced(self, name: str = None, category: str = "main") -> Callable:
+        """Decorator recording a span for every call of the function.
+
+        Args:
+            name (str, optional): The name of the span. Defaults to the qualified function name.
+            category (str, optional): The category of the span. Defaults to "main".
+
+        Returns:
+            Callable: The decorator.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            span_name = name if name else func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add_complete(span_name, category, start, perf_counter())
+
+            return wrapper
+
+        return decorator
+
+    def add_complete(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record a span that started and ended at the given perf_counter times.
+
+        Args:
+            name (str): The name of the span.
+            category (str): The category of the span.
+            start (float): perf_counter when the span started.
+            end (float): perf_counter when the span ended.
+            args (Optional[Dict[str, Any]], optional): Values shown with the span. Defaults to None.
+        """
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.events.append(("X", name, category, start, end - start, tid, args))
+
+    def instant(self, name: str, category: str = "main", **args: Any) -> None:
+        """Record a point in time, e.g. a map switch.
+
+        Args:
+            name (str): The name of the event.
+            category (str, optional): The category of the event. Defaults to "main".
+            **args (Any): Values shown with the event.
+        """
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.events.append(("i", name, category, perf_counter(), 0.0, tid, args or None))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the recorded events in the Chrome trace-event format.
+
+        Returns:
+            Dict[str, Any]: The trace, ready to be dumped as JSON.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for tid, thread_name in list(self.thread_names.items()):
+            trace_events.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+            )
+        for phase, name, category, start, duration, tid, args in list(self.events):
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": phase,
+                "ts": (start - self.__origin) * 1_000_000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if phase == "X":
+                event["dur"] = duration * 1_000_000
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> None:
+        """Write the recorded events to a Chrome trace-event JSON file.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+
+# the tracer shared by the whole game
+tracer = Tracer()
+
+
+def span(name: str, category: str = "main", **args: Any) -> Span | NullSpan:
+    """Time a block of code with the shared tracer, see Tracer.span."""
+    return tracer.span(name, category, **args)
+
+
+def traced(name: str = None, category: str = "main") -> Callable:
+    """Decorator recording a span with the shared tracer, see Tracer.traced."""
+    return tracer.traced(name, category)
@@ -1,4 +1,7 @@
-from typing import Iterable, Any, Callable, Generator, Union
+from typing import Iterable, Any, Callable, Generator, Union, Hashable, Dict
+from collections import OrderedDict
+
+_MISSING = object()
 
 
 def cycle(
@@ -25,3 +28,88 @@ def cycle(
             else:
                 iterator = iter(iterable)
             yield next(iterator)
+
+
+class LRUCache:
+    """Bounded least recently used cache with hit-rate statistics.
+
+    Args:
+        maxsize (int): The maximum number of entries kept in the cache.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the value of key and mark it as recently used.
+
+        Args:
+            key (Hashable): The key to look up.
+            default (Any): Returned when the key is not cached.
+
+        Returns:
+            Any: The cached value or default.
+        """
+        if key not in self.__entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return self.__entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache value under key, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): The key to cache the value under.
+            value (Any): The value to cache.
+        """
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """Get the value of key, creating and caching it on a miss.
+
+        Args:
+            key (Hashable): The key to look up.
+            create (Callable[[], Any]): Creates the value when the key is not cached.
+
+        Returns:
+            Any: The cached or newly created value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self.__entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }